@@ -34,7 +34,8 @@ response = es.search(
     index="test_index",
     size=100,
     _source=["mysqlInsertTime", "createTime"],
-    query={"match_all": {}},
+    # 排除已删除工单留下的墓碑文档，也可以直接查询过滤别名{index_name}_live
+    query={"bool": {"must_not": [{"term": {"BinlogDeleted": True}}]}},
     sort=[
         {
             "_script": {
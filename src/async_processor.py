@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: asyncio版事件处理器
+
+from elasticsearch import AsyncElasticsearch
+from loguru import logger
+from typing import Dict, List
+import asyncio
+import time
+
+from base_processor import action_request, is_conflict_error, is_ignorable_error, is_retryable_error
+from dead_letter import dead_letter
+from metrics import ES_CONFLICTS, ES_ERRORS, ES_REQUEST_SECONDS
+from parallel_apply import partition_key
+
+
+class AsyncEventProcessor:
+    """基于AsyncElasticsearch的事件处理器
+
+    ES动作仍由同步版的TableHandler构造，请求改为异步发出，同时在途的请求数
+    受max_in_flight限制，达到上限时handle_event等待，从而对读取端形成背压。
+    同一目标文档的请求串成链依次执行，不同文档的请求并发执行。
+    """
+    def __init__(self, es_client: AsyncElasticsearch, max_in_flight: int = 200):
+        self.es_client = es_client
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        # 目标文档ID -> 该文档最后一个请求任务
+        self._tails: Dict[str, asyncio.Task] = {}
+        # 上次drain之后失败的请求数
+        self._failed = 0
+        self.handlers = {}
+        self._init_handlers()
+
+    def _init_handlers(self):
+        """每张源表创建一个只用于构造ES动作的处理器"""
+        from handlers import TableHandler, TABLE_SPECS
+
+        self.handlers = {table: TableHandler(None, spec) for table, spec in TABLE_SPECS.items()}
+
+    async def handle_event(self, action: str, data: Dict) -> bool:
+        """构造ES动作并提交为异步任务，在途请求达到上限时等待
+
+        Returns:
+            bool: 是否已提交或跳过，返回False时需要重放
+        """
+        table = data.get('table')
+        handler = self.handlers.get(table)
+        if handler is None:
+            # 没有同步规则的表不写入ES，跳过后检查点照常推进
+            logger.warning(f"未找到表 {table} 的处理器")
+            return True
+        try:
+            actions = handler.build_actions(action, data)
+        except Exception as e:
+            dead_letter(f"构造ES动作失败: {str(e)}", rows=[data])
+            return True
+        if actions is None:
+            dead_letter(f"未能构造ES动作: 操作类型={action}", rows=[data])
+            return True
+
+        await self._semaphore.acquire()
+        key = partition_key(data)
+        previous = self._tails.get(key)
+        self._tails[key] = asyncio.ensure_future(self._run(key, previous, actions, data))
+        return True
+
+    async def drain(self) -> int:
+        """等待已提交的全部请求完成
+
+        Returns:
+            int: 上次drain之后失败的请求数
+        """
+        while self._tails:
+            await asyncio.wait(list(self._tails.values()))
+        failed, self._failed = self._failed, 0
+        return failed
+
+    async def _run(self, key: str, previous, actions: List[Dict], data: Dict):
+        try:
+            if previous is not None:
+                # 等待同一文档的前一个请求完成，保证写入顺序
+                await asyncio.wait([previous])
+            for es_action in actions:
+                if not await self._execute_action(es_action, data):
+                    self._failed += 1
+        except Exception as e:
+            self._failed += 1
+            logger.error(f"写入事件时发生错误: {str(e)}, event: {data}")
+        finally:
+            self._semaphore.release()
+            if self._tails.get(key) is asyncio.current_task():
+                del self._tails[key]
+
+    async def _execute_action(self, es_action: Dict, data: Dict) -> bool:
+        """异步执行单个ES动作"""
+        op_type, index, doc_id, body, params = action_request(es_action)
+        started = time.perf_counter()
+        try:
+            if op_type == "index":
+                await self.es_client.index(index=index, id=doc_id, body=body, **params)
+            elif op_type == "update":
+                await self.es_client.update(index=index, id=doc_id, body=body, **params)
+            elif op_type == "delete":
+                await self.es_client.delete(index=index, id=doc_id, **params)
+            else:
+                dead_letter(f"未定义的ES操作: {op_type}", es_action, [data])
+            return True
+        except Exception as e:
+            if is_ignorable_error(e, es_action):
+                return True
+            if is_conflict_error(e):
+                ES_CONFLICTS.labels(index).inc()
+            ES_ERRORS.labels(op_type).inc()
+            if not is_retryable_error(e):
+                dead_letter(f"ES {op_type}被拒绝: {str(e)}", es_action, [data])
+                return True
+            logger.error(f"ES {op_type}失败: 索引={index}, ID={doc_id}, 来源行={data.get('table')}:{data.get('Id')}, {str(e)}")
+            return False
+        finally:
+            ES_REQUEST_SECONDS.labels(op_type).observe(time.perf_counter() - started)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 初始化数据的进度文件和速度统计
+
+from loguru import logger
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import time
+
+from checkpoint import atomic_write
+
+
+def unit_key(table_name: Optional[str], id_range: Optional[Tuple[int, int]]) -> str:
+    """工作单元在进度文件中的键，table_name为None表示组装工单文档"""
+    name = table_name or "documents"
+    return f"{name}:{id_range[0]}-{id_range[1]}" if id_range else name
+
+
+class BackfillState:
+    """记录初始化已完成的工作单元，中断后按相同参数重新运行时跳过已完成的部分
+
+    文件内容为JSON: {start_time, end_time, mode, id_ranges, done, updated_at}，
+    done为工作单元键到处理行数的映射。id_ranges一并保存，继续时沿用相同的切分。
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.state: Dict = {}
+
+    def resume(self, start_time: str, end_time: Optional[str], mode: str) -> bool:
+        """读取进度文件，参数一致时继续上次的初始化
+
+        end_time为None时沿用进度文件中的结束时间。
+
+        Returns:
+            bool: 是否继续上次的初始化
+        """
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            logger.error(f"读取初始化进度文件时发生错误: {str(e)}")
+            return False
+        if state.get("start_time") != start_time or state.get("mode") != mode \
+                or (end_time is not None and state.get("end_time") != end_time):
+            logger.warning(f"初始化进度文件的参数与本次不一致，重新开始: {self.path}")
+            return False
+        self.state = state
+        return True
+
+    def begin(self, start_time: str, end_time: str, mode: str, id_ranges: List[Tuple[int, int]]):
+        """开始新的初始化，记录参数和Id段切分"""
+        self.state = {
+            "start_time": start_time,
+            "end_time": end_time,
+            "mode": mode,
+            "id_ranges": [list(id_range) for id_range in id_ranges],
+            "done": {},
+        }
+        self._save()
+
+    @property
+    def end_time(self) -> Optional[str]:
+        return self.state.get("end_time")
+
+    @property
+    def id_ranges(self) -> Optional[List[Tuple[int, int]]]:
+        id_ranges = self.state.get("id_ranges")
+        return [tuple(id_range) for id_range in id_ranges] if id_ranges is not None else None
+
+    @property
+    def done_count(self) -> int:
+        return len(self.state.get("done", {}))
+
+    def is_done(self, key: str) -> bool:
+        return key in self.state.get("done", {})
+
+    def mark_done(self, key: str, rows: int):
+        """记录一个工作单元已完成并立即写盘"""
+        self.state.setdefault("done", {})[key] = rows
+        self._save()
+
+    def finish(self):
+        """全部完成后删除进度文件，之后相同参数的运行重新初始化"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _save(self):
+        self.state["updated_at"] = time.strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            atomic_write(self.path, json.dumps(self.state, ensure_ascii=False))
+        except Exception as e:
+            logger.error(f"保存初始化进度时发生错误: {str(e)}")
+
+
+class BackfillProgress:
+    """按表统计初始化进度
+
+    每个工作单元完成时记录行数和耗时。表的速度为该表已完成单元的行数除以单元耗时之和，
+    即单个工作线程的处理速度；预计剩余时间按剩余单元数、平均单元耗时和并行数估算。
+    """
+    def __init__(self, units: List[Tuple[Optional[str], Optional[Tuple[int, int]]]], workers: int = 1):
+        self.workers = max(1, workers)
+        self.started = time.time()
+        self.total_units = len(units)
+        self.done_units = 0
+        self.total_rows = 0
+        self._tables: Dict[str, Dict] = {}
+        for table_name, _ in units:
+            stats = self._tables.setdefault(table_name or "documents", {"total": 0, "done": 0, "rows": 0, "seconds": 0.0})
+            stats["total"] += 1
+
+    def unit_done(self, table_name: Optional[str], rows: int, seconds: float) -> str:
+        """记录一个工作单元完成，返回进度描述"""
+        name = table_name or "documents"
+        stats = self._tables[name]
+        stats["done"] += 1
+        stats["rows"] += rows
+        stats["seconds"] += seconds
+        self.done_units += 1
+        self.total_rows += rows
+
+        rate = stats["rows"] / stats["seconds"] if stats["seconds"] > 0 else 0
+        remaining = stats["total"] - stats["done"]
+        eta = remaining * stats["seconds"] / stats["done"] / min(self.workers, max(1, remaining))
+        elapsed = time.time() - self.started
+        total_eta = (self.total_units - self.done_units) * elapsed / self.done_units
+        return (
+            f"表 {name}: {stats['done']}/{stats['total']} 个单元, {stats['rows']} 行, "
+            f"{rate:.0f} 行/秒, 预计剩余 {self._format(eta)}; "
+            f"总计: {self.done_units}/{self.total_units} 个单元, {self.total_rows} 行, "
+            f"{self.total_rows / elapsed if elapsed > 0 else 0:.0f} 行/秒, 预计剩余 {self._format(total_eta)}"
+        )
+
+    @staticmethod
+    def _format(seconds: float) -> str:
+        seconds = int(seconds)
+        if seconds >= 3600:
+            return f"{seconds // 3600}小时{seconds % 3600 // 60}分"
+        if seconds >= 60:
+            return f"{seconds // 60}分{seconds % 60}秒"
+        return f"{seconds}秒"
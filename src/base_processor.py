@@ -5,12 +5,18 @@
 # comment: 事件处理器基类
 
 from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import ConnectionError as ESConnectionError
 from loguru import logger
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, Optional, List, Tuple
 import os
 import configparser
 import time
 
+from scripts import (DELETED_FIELD, DOC_DELETE_ID, DOC_UPSERT_ID, NESTED_UPSERT_ID, NESTED_REMOVE_ID, SEQ_FIELD,
+                     stored_script)
+from metrics import ES_CONFLICTS, ES_ERRORS, ES_REQUEST_SECONDS, STALE_WRITES
+from dead_letter import dead_letter
+
 config = configparser.ConfigParser()
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
@@ -18,10 +24,106 @@ config_path = os.path.join(project_root, "conf", "db.cnf")
 config.read(config_path)
 index_name = config.get("target", "index_name")
 
+# 可直接透传给ES请求的动作元数据参数
+ACTION_PARAMS = ("_retry_on_conflict", "_version", "_version_type")
+# 主索引上的update与在线初始化补写、其他子表的更新并发修改同一宽表文档，冲突时ES端重新读取后执行的次数
+RETRY_ON_CONFLICT = 3
+
+
+def is_missing_error(e) -> bool:
+    """判断ES异常是否为文档不存在"""
+    return "document_missing_exception" in str(e) or "404" in str(e)
+
+
+def is_conflict_error(e) -> bool:
+    """判断ES异常是否为版本冲突"""
+    return "version_conflict_engine_exception" in str(e)
+
+
+def is_retryable_status(status: int) -> bool:
+    """请求超时、版本冲突、限流和服务端错误重放后可能成功，其余4xx错误重放也会被拒绝"""
+    return status in (408, 409, 429) or status >= 500
+
+
+def is_retryable_error(e) -> bool:
+    """连接错误和可重试状态码的ES异常需要重放，请求被拒绝、序列化失败等错误重放也不会成功"""
+    if isinstance(e, (ESConnectionError, ConnectionError, TimeoutError)):
+        return True
+    status = getattr(e, "status_code", None)
+    return isinstance(status, int) and is_retryable_status(status)
+
+
+def is_upsert_action(action: Dict) -> bool:
+    """判断update动作在文档不存在时是否会自动创建"""
+    return "upsert" in action or action.get("doc_as_upsert", False)
+
+
+def nested_op(es_action: Dict) -> Optional[Dict]:
+    """把主索引上的局部更新或嵌套数组动作转换为合并脚本中的操作，不可合并时返回None"""
+    if es_action["_op_type"] != "update" or es_action["_index"] != index_name:
+        return None
+    if "doc" in es_action:
+        return {"type": "doc", "doc": es_action["doc"]} if es_action.get("doc_as_upsert") else None
+    script = es_action.get("script", {})
+    params = script.get("params", {})
+    if script.get("id") == DOC_UPSERT_ID:
+        return {"type": "doc", **params}
+    if script.get("id") == NESTED_UPSERT_ID:
+        return {"type": "upsert", **params}
+    if script.get("id") == NESTED_REMOVE_ID:
+        return {"type": "remove", **params}
+    return None
+
+
+def action_request(es_action: Dict) -> Tuple[str, str, str, Optional[Dict], Dict]:
+    """把ES批量格式的动作拆分为单文档API的参数
+
+    Returns:
+        tuple: (操作类型, 索引, 文档ID, 请求体, 透传参数)
+    """
+    params = {key[1:]: es_action[key] for key in ACTION_PARAMS if key in es_action}
+    if "_source" in es_action:
+        body = es_action["_source"]
+    elif es_action["_op_type"] == "update":
+        body = {key: value for key, value in es_action.items() if not key.startswith("_")}
+    else:
+        body = None
+    return es_action["_op_type"], es_action["_index"], es_action["_id"], body, params
+
+
+def is_stale_write(es_action: Dict, status: int) -> bool:
+    """带外部版本号的写入返回409，说明ES中已是相同或更新的数据，记入指标后视为成功"""
+    if status != 409 or es_action.get("_version_type") != "external":
+        return False
+    STALE_WRITES.labels(es_action["_index"]).inc()
+    return True
+
+
+def is_ignorable_error(e, es_action: Dict) -> bool:
+    """删除或移除嵌套元素时文档不存在、写入的版本号较旧，视为成功"""
+    op_type = es_action["_op_type"]
+    if is_conflict_error(e) and is_stale_write(es_action, 409):
+        return True
+    return is_missing_error(e) and (op_type == "delete" or (op_type == "update" and not is_upsert_action(es_action)))
+
+
+def versioned(es_action: Dict, seq: Optional[int]) -> Dict:
+    """以binlog序号作为外部版本号，seq为None时不带版本号"""
+    if seq is not None:
+        es_action["_version"] = seq
+        es_action["_version_type"] = "external"
+    return es_action
+
+
 class BaseProcessor:
-    """事件处理器基类，提供基础的ES操作方法"""
-    def __init__(self, es_client: Elasticsearch):
+    """事件处理器基类，提供基础的ES操作方法
+    
+    处理器通过build_actions把一条行事件转换为ES批量格式的动作列表，
+    未配置bulk_writer时逐条同步执行，配置后写入缓冲区由bulk_writer批量提交。
+    """
+    def __init__(self, es_client: Elasticsearch, bulk_writer=None):
         self.es_client = es_client
+        self.bulk_writer = bulk_writer
     
     def __enter__(self):
         return self
@@ -29,70 +131,160 @@ class BaseProcessor:
     def __exit__(self, exc_type, exc_val, exc_tb):
         pass
     
-    def _execute_es(self, operation: str, doc_id: str, doc_body: Dict) -> bool:
-        """执行ES操作"""
+    def build_actions(self, action: str, data: Dict) -> Optional[List[Dict]]:
+        """把行事件转换为ES动作列表，由子类实现
+        
+        Returns:
+            list: ES批量格式的动作列表，未定义的操作类型返回None
+        """
+        raise NotImplementedError
+    
+    def handle(self, action: str, data: Dict) -> bool:
+        """处理单条行事件
+        
+        Returns:
+            bool: 是否已写入，或已记入死信日志；返回False时需要重放
+        """
         try:
-            if operation == "index":
-                # 使用upsert操作，如果文档不存在则创建，存在则更新
-                self.es_client.update(
-                    index=index_name,
-                    id=doc_id,
-                    body={"doc": doc_body, "doc_as_upsert": True}
-                )
-                # logger.success(f"ES索引成功: 索引={index_name}, ID={doc_id}")
-                return True
+            actions = self.build_actions(action, data)
+        except Exception as e:
+            # 动作只由行数据决定，重放也会失败
+            dead_letter(f"构造ES动作失败: {str(e)}", rows=[data])
+            return True
+        return self.apply(action, data, actions)
+    
+    def apply(self, action: str, data: Dict, actions: Optional[List[Dict]]) -> bool:
+        """提交已构造好的ES动作，动作可能在其他进程中由build_actions生成"""
+        if actions is None:
+            dead_letter(f"未能构造ES动作: 操作类型={action}", rows=[data])
+            return True
+        return self._submit(actions, data)
+    
+    def _submit(self, actions: List[Dict], data: Dict = None) -> bool:
+        """提交ES动作，批量模式下只写入缓冲区"""
+        if self.bulk_writer is not None:
+            for es_action in actions:
+                self.bulk_writer.add(es_action, data)
+            return True
+        result = True
+        for es_action in actions:
+            result = self._execute_action(es_action, data) and result
+        return result
+    
+    def _execute_action(self, es_action: Dict, data: Dict = None) -> bool:
+        """同步执行单个ES动作，被永久拒绝时记入死信日志后视为已处理"""
+        op_type, index, doc_id, body, params = action_request(es_action)
+        started = time.perf_counter()
+        try:
+            if op_type == "index":
+                self.es_client.index(index=index, id=doc_id, body=body, **params)
+            elif op_type == "update":
+                self.es_client.update(index=index, id=doc_id, body=body, **params)
+            elif op_type == "delete":
+                self.es_client.delete(index=index, id=doc_id, **params)
             else:
-                logger.warning(f"未定义的ES操作: {operation}")
-                return False
+                dead_letter(f"未定义的ES操作: {op_type}", es_action, [data])
+            return True
         except Exception as e:
-            logger.error(f"ES操作失败: 索引={index_name}, ID={doc_id}, {str(e)}")
+            if is_ignorable_error(e, es_action):
+                return True
+            if is_conflict_error(e):
+                ES_CONFLICTS.labels(index).inc()
+            ES_ERRORS.labels(op_type).inc()
+            if not is_retryable_error(e):
+                dead_letter(f"ES {op_type}被拒绝: {str(e)}", es_action, [data])
+                return True
+            logger.error(f"ES {op_type}失败: 索引={index}, ID={doc_id}, {str(e)}")
             return False
+        finally:
+            ES_REQUEST_SECONDS.labels(op_type).observe(time.perf_counter() - started)
     
-    def _update_with_retry(self, doc_id: str, update_func: Callable, create_doc_func: Callable, max_retries: int = 3, retry_delay: float = 0.5) -> bool:
-        """带有重试机制的ES更新操作
-        
-        Args:
-            doc_id: 文档ID
-            update_func: 更新函数，接收当前文档和版本号，返回更新后的结果
-            create_doc_func: 创建文档函数，当文档不存在时调用
-            max_retries: 最大重试次数
-            retry_delay: 初始重试延迟（秒）
-            
-        Returns:
-            bool: 操作是否成功
+    def _doc_upsert_action(self, doc_id: str, doc_body: Dict, index: str = index_name, seq: Optional[int] = None) -> Dict:
+        """局部更新文档，文档不存在时创建
+
+        带binlog序号时序号记录在文档中，不大于已记录序号的更新不执行。
+        update不支持外部版本号，由脚本比较序号。
         """
-        retries = 0
-        while retries <= max_retries:
-            try:
-                # 先获取当前文档，包括版本号
-                try:
-                    current_doc = self.es_client.get(index=index_name, id=doc_id)
-                    version = current_doc.get('_version')
-                    source = current_doc.get('_source', {})
-                    # 调用更新函数
-                    return update_func(source, version)
-                except Exception as e:
-                    if "document_missing_exception" in str(e) or "404" in str(e):
-                        # 文档不存在，调用创建函数
-                        return create_doc_func()
-                    else:
-                        raise e
-                        
-            except Exception as e:
-                if "version_conflict_engine_exception" in str(e) and retries < max_retries:
-                    # 版本冲突，等待后重试
-                    retries += 1
-                    # 指数退避策略
-                    sleep_time = retry_delay * (2 ** (retries - 1))
-                    logger.warning(f"ES更新版本冲突，第{retries}次重试: 索引={index_name}, ID={doc_id}, 等待{sleep_time}秒")
-                    time.sleep(sleep_time)
-                    continue
-                elif "document_missing_exception" in str(e) or "404" in str(e):
-                    # 文档不存在，调用创建函数
-                    return create_doc_func()
-                else:
-                    logger.error(f"ES更新失败: 索引={index_name}, ID={doc_id}, {str(e)}")
-                    return False
-        
-        logger.error(f"ES更新失败，超过最大重试次数: 索引={index_name}, ID={doc_id}")
-        return False
\ No newline at end of file
+        if seq is not None:
+            return {
+                "_op_type": "update",
+                "_index": index,
+                "_id": doc_id,
+                "_retry_on_conflict": RETRY_ON_CONFLICT,
+                "script": stored_script(DOC_UPSERT_ID, {"doc": doc_body, "seq": seq}),
+                "upsert": {**doc_body, SEQ_FIELD: seq}
+            }
+        return {
+            "_op_type": "update",
+            "_index": index,
+            "_id": doc_id,
+            "_retry_on_conflict": RETRY_ON_CONFLICT,
+            "doc": doc_body,
+            "doc_as_upsert": True
+        }
+    
+    def _index_action(self, doc_id: str, doc_body: Dict, index: str = index_name, seq: Optional[int] = None) -> Dict:
+        """整体写入文档，带binlog序号时以其作为外部版本号"""
+        return versioned({"_op_type": "index", "_index": index, "_id": doc_id, "_source": doc_body}, seq)
+    
+    def _delete_action(self, doc_id: str, index: str = index_name, seq: Optional[int] = None) -> Dict:
+        """删除文档，带binlog序号时以其作为外部版本号"""
+        return versioned({"_op_type": "delete", "_index": index, "_id": doc_id}, seq)
+
+    def _doc_delete_action(self, doc_id: str, seq: Optional[int] = None) -> Dict:
+        """删除宽表文档，带binlog序号时留下墓碑
+
+        宽表文档由update写入，使用内部版本号，删除后的外部版本号拦不住旧的upsert。
+        墓碑记录删除的序号，序号不大于它的顶层和嵌套更新由脚本跳过，文档不存在时也创建墓碑。
+        """
+        if seq is None:
+            return self._delete_action(doc_id)
+        return {
+            "_op_type": "update",
+            "_index": index_name,
+            "_id": doc_id,
+            "_retry_on_conflict": RETRY_ON_CONFLICT,
+            "script": stored_script(DOC_DELETE_ID, {"seq": seq}),
+            "upsert": {SEQ_FIELD: seq, DELETED_FIELD: True}
+        }
+    
+    def _nested_upsert_action(self, doc_id: str, field: str, item: Dict, key: str = 'Id',
+                              seq: Optional[int] = None) -> Dict:
+        """更新或追加嵌套数组元素，文档不存在时以该元素创建文档
+
+        带binlog序号时序号记录在元素中，已有元素的序号不小于它时不更新。
+        """
+        if seq is not None:
+            item = {**item, SEQ_FIELD: seq}
+        return {
+            "_op_type": "update",
+            "_index": index_name,
+            "_id": doc_id,
+            "_retry_on_conflict": RETRY_ON_CONFLICT,
+            "script": stored_script(NESTED_UPSERT_ID, {"field": field, "key": key, "item": item}),
+            "upsert": {field: [item]}
+        }
+    
+    def _nested_remove_action(self, doc_id: str, field: str, value: Any, key: str = 'Id',
+                              seq: Optional[int] = None) -> Dict:
+        """删除嵌套数组元素，带binlog序号时不删除序号不小于它的元素"""
+        params = {"field": field, "key": key, "value": value}
+        if seq is not None:
+            params["seq"] = seq
+        return {
+            "_op_type": "update",
+            "_index": index_name,
+            "_id": doc_id,
+            "_retry_on_conflict": RETRY_ON_CONFLICT,
+            "script": stored_script(NESTED_REMOVE_ID, params)
+        }
+    
+    def _nested_actions(self, action: str, doc_id: str, field: str, item: Dict, key: str = 'Id',
+                        seq: Optional[int] = None) -> Optional[List[Dict]]:
+        """嵌套字段子表的通用insert/update/delete动作"""
+        if action in ("insert", "update"):
+            # 新增也按主键合并进数组，避免覆盖同一工单下已有的其他元素
+            return [self._nested_upsert_action(doc_id, field, item, key, seq)]
+        elif action == "delete":
+            return [self._nested_remove_action(doc_id, field, str(item[key]), key, seq)]
+        return None
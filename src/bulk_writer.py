@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: ES批量写入缓冲区
+
+from elasticsearch import Elasticsearch
+from loguru import logger
+from typing import Dict, List, Tuple
+import threading
+import time
+
+from base_processor import ACTION_PARAMS, is_retryable_error, is_retryable_status, is_stale_write, is_upsert_action
+from dead_letter import dead_letter
+from doc_aggregator import DocumentAggregator
+from metrics import BULK_ACTIONS, ES_CONFLICTS, ES_ERRORS, ES_REQUEST_SECONDS
+
+
+class BulkWriter:
+    """缓冲处理器产生的ES动作，按数量或时间阈值通过_bulk接口批量提交
+
+    每个动作都记录其来源行事件，批量响应中的单条错误会映射回对应的表和行Id。
+    可重试的错误计入失败数，请求格式、映射等永久错误记入死信日志后跳过。
+    开启aggregate时，提交前把同一工单文档的子表更新合并为一次脚本更新。
+    """
+    def __init__(self, es_client: Elasticsearch, max_actions: int = 500, flush_interval: float = 1.0,
+                 aggregate: bool = False):
+        self.es_client = es_client
+        self.max_actions = max_actions
+        self.flush_interval = flush_interval
+        self.aggregator = DocumentAggregator() if aggregate else None
+        self._buffer: List[Tuple[Dict, List[Dict]]] = []
+        self._first_add_time = None
+        # 按数量或时间阈值自动提交时失败的动作数，由下一次flush返回
+        self._failed = 0
+        # _lock保护缓冲区，_flush_lock保证批次按顺序提交，避免同一文档的更新乱序
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flush_thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """启动定时刷新线程"""
+        if self._flush_thread is None:
+            self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flush_thread.start()
+
+    def close(self):
+        """停止定时刷新并提交剩余动作"""
+        self._stop_event.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+
+    def add(self, es_action: Dict, data: Dict = None):
+        """写入一个ES动作，达到数量阈值时立即提交"""
+        with self._lock:
+            if not self._buffer:
+                self._first_add_time = time.time()
+            self._buffer.append((es_action, [data] if data is not None else []))
+            full = len(self._buffer) >= self.max_actions
+        if full:
+            self._flush_background()
+
+    def flush(self) -> int:
+        """提交缓冲区中的全部动作
+
+        Returns:
+            int: 失败的动作数，包括上次调用之后自动提交时失败的动作
+        """
+        failed = self._flush_buffer()
+        with self._lock:
+            failed, self._failed = failed + self._failed, 0
+        return failed
+
+    def _flush_background(self):
+        """按阈值自动提交，失败数留给下一次flush返回"""
+        failed = self._flush_buffer()
+        if failed:
+            with self._lock:
+                self._failed += failed
+
+    def _flush_buffer(self) -> int:
+        """提交缓冲区，返回失败的动作数"""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._buffer = self._buffer, []
+                self._first_add_time = None
+            if not entries:
+                return 0
+            try:
+                return self._send(entries)
+            except Exception as e:
+                logger.error(f"ES批量提交时发生错误: 动作数={len(entries)}, {str(e)}")
+                return len(entries)
+
+    def _flush_loop(self):
+        """按时间阈值刷新，保证低流量时动作也能及时写入"""
+        while not self._stop_event.wait(self.flush_interval / 2):
+            with self._lock:
+                due = self._first_add_time is not None and time.time() - self._first_add_time >= self.flush_interval
+            if due:
+                self._flush_background()
+
+    def _send(self, entries: List[Tuple[Dict, List[Dict]]]) -> int:
+        """发送一个批次并把单条错误映射回来源事件"""
+        if self.aggregator is not None:
+            entries = self.aggregator.merge(entries)
+        body = []
+        for es_action, _ in entries:
+            body.extend(self._to_bulk_lines(es_action))
+
+        BULK_ACTIONS.observe(len(entries))
+        try:
+            with ES_REQUEST_SECONDS.labels("bulk").time():
+                response = self.es_client.bulk(body=body)
+        except Exception as e:
+            ES_ERRORS.labels("bulk").inc()
+            if not is_retryable_error(e):
+                # 整个请求被拒绝，重放同样的批次也会失败
+                for es_action, sources in entries:
+                    dead_letter(f"ES批量请求被拒绝: {str(e)}", es_action, sources)
+                return 0
+            logger.error(f"ES批量提交失败: 动作数={len(entries)}, {str(e)}")
+            return len(entries)
+
+        if not response.get("errors"):
+            return 0
+
+        failed = 0
+        for (es_action, sources), item in zip(entries, response["items"]):
+            op_type, result = next(iter(item.items()))
+            status = result.get("status", 500)
+            if 200 <= status < 300:
+                continue
+            if status == 404 and (op_type == "delete" or (op_type == "update" and not is_upsert_action(es_action))):
+                # 删除或移除嵌套元素时文档不存在，视为成功
+                continue
+            if is_stale_write(es_action, status):
+                continue
+            if status == 409:
+                # ES端按retry_on_conflict重试后仍冲突
+                ES_CONFLICTS.labels(es_action["_index"]).inc()
+            ES_ERRORS.labels(op_type).inc()
+            if not is_retryable_status(status):
+                dead_letter(f"ES批量{op_type}被拒绝: {result.get('error')}", es_action, sources)
+                continue
+            failed += 1
+            rows = ", ".join(f"{source.get('table')}:{source.get('Id')}" for source in sources)
+            logger.error(
+                f"ES批量{op_type}失败: 索引={es_action['_index']}, ID={es_action['_id']}, "
+                f"来源行=[{rows}], {result.get('error')}"
+            )
+        return failed
+
+    @staticmethod
+    def _to_bulk_lines(es_action: Dict) -> List[Dict]:
+        """把动作转换为_bulk请求的元数据行和内容行"""
+        op_type = es_action["_op_type"]
+        meta = {"_index": es_action["_index"], "_id": es_action["_id"]}
+        for key in ACTION_PARAMS:
+            if key in es_action:
+                meta[key[1:]] = es_action[key]
+        lines = [{op_type: meta}]
+        if op_type == "index":
+            lines.append(es_action["_source"])
+        elif op_type == "update":
+            lines.append({key: value for key, value in es_action.items() if not key.startswith("_")})
+        return lines
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: binlog位点检查点文件
+
+from loguru import logger
+from typing import Dict, Optional
+import json
+import os
+import threading
+import time
+
+
+def atomic_write(path: str, content: str):
+    """先写临时文件并落盘，再原子替换目标文件，进程中途退出也不会留下半个文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CheckpointStore:
+    """记录已被ES确认的binlog位点
+
+    位点只在调用方确认之前的事件全部写入ES后保存，两次写盘间隔不小于min_interval，
+    位点未变化时不写盘。文件内容为JSON: {log_file, log_pos, gtid_set, updated_at}，
+    gtid_set为已同步事务的GTID集合。
+    """
+    def __init__(self, path: str, min_interval: float = 0.5):
+        self.path = path
+        self.min_interval = min_interval
+        self._last = None
+        self._last_save_time = 0.0
+        self._lock = threading.Lock()
+
+    def load(self) -> Optional[Dict]:
+        """读取检查点，文件不存在或内容无效时返回None"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get("log_file") and checkpoint.get("log_pos"):
+                self._last = (checkpoint["log_file"], checkpoint["log_pos"], checkpoint.get("gtid_set"))
+                return checkpoint
+            logger.warning(f"检查点文件内容无效: {self.path}")
+        except Exception as e:
+            logger.error(f"读取检查点文件时发生错误: {str(e)}")
+        return None
+
+    def save(self, log_file: str, log_pos: int, gtid_set: Optional[str] = None, force: bool = False) -> bool:
+        """保存位点，距上次写盘不足min_interval时跳过（force为True时除外）
+
+        Returns:
+            bool: 是否写入了文件
+        """
+        position = (log_file, int(log_pos), gtid_set)
+        with self._lock:
+            now = time.time()
+            if position == self._last:
+                return False
+            if not force and now - self._last_save_time < self.min_interval:
+                return False
+            checkpoint = {
+                "log_file": log_file,
+                "log_pos": int(log_pos),
+                "gtid_set": gtid_set,
+                "updated_at": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))
+            }
+            try:
+                atomic_write(self.path, json.dumps(checkpoint, ensure_ascii=False))
+            except Exception as e:
+                logger.error(f"保存检查点时发生错误: {str(e)}")
+                return False
+            self._last = position
+            self._last_save_time = now
+            logger.debug(f"已保存binlog检查点: {log_file}:{log_pos}")
+            return True
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 行事件合并器，窗口内同一行只保留最新镜像
+
+from loguru import logger
+from typing import Dict, Tuple, Callable, Optional
+import threading
+import time
+
+
+class EventCoalescer:
+    """在时间窗口内按(表, 行Id)合并行事件，只把每行的最新镜像交给处理器
+
+    合并规则:
+        insert + update -> insert(最新镜像)
+        insert + delete -> 整体抵消
+        update + update/delete -> 以后到的事件为准
+        delete + insert -> 先提交窗口内已有事件，再开启新的窗口
+    合并后的事件按各行最后一次变更的先后顺序提交。
+    """
+    def __init__(self, handle_event: Callable[[str, Dict], bool], window: float = 0.3, max_keys: int = 5000):
+        self.handle_event = handle_event
+        self.window = window
+        self.max_keys = max_keys
+        self._pending: Dict[Tuple, Tuple[str, Dict]] = {}
+        self._window_start = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flush_thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """启动窗口到期检查线程"""
+        if self._flush_thread is None:
+            self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flush_thread.start()
+
+    def close(self):
+        """停止检查线程并提交剩余事件"""
+        self._stop_event.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+
+    def add(self, action: str, data: Dict) -> bool:
+        """接收一条行事件，与窗口内同一行的事件合并"""
+        row_id = data.get('Id')
+        if row_id is None:
+            # 无法确定行标识的事件不参与合并，先提交窗口保证顺序
+            self.flush()
+            return self.handle_event(action, data)
+
+        key = (data.get('table'), row_id)
+        with self._lock:
+            previous = self._pending.get(key)
+            reinsert = previous is not None and previous[0] == "delete" and action == "insert"
+        if reinsert:
+            self.flush()
+
+        with self._lock:
+            previous = self._pending.pop(key, None)
+            merged = self._merge(previous[0] if previous else None, action)
+            if merged is not None:
+                # 重新插入使字典顺序与各行最后一次变更的顺序一致
+                self._pending[key] = (merged, data)
+            if self._window_start is None and self._pending:
+                self._window_start = time.time()
+            due = len(self._pending) >= self.max_keys or self._is_due()
+        if due:
+            self.flush()
+        return True
+
+    def flush(self) -> int:
+        """把窗口内合并后的事件提交给处理器
+
+        Returns:
+            int: 提交的事件数
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._window_start = None
+            for action, data in pending.values():
+                self.handle_event(action, data)
+            return len(pending)
+
+    @staticmethod
+    def _merge(previous: Optional[str], action: str) -> Optional[str]:
+        """合并同一行的前后两个事件，返回None表示相互抵消"""
+        if previous is None:
+            return action
+        if previous == "insert":
+            return None if action == "delete" else "insert"
+        return action
+
+    def _is_due(self) -> bool:
+        return self._window_start is not None and time.time() - self._window_start >= self.window
+
+    def _flush_loop(self):
+        """窗口到期后即使没有新事件也及时提交"""
+        while not self._stop_event.wait(self.window / 2):
+            with self._lock:
+                due = self._is_due()
+            if due:
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"提交合并事件时发生错误: {str(e)}")
@@ -9,6 +9,8 @@ from loguru import logger
 import configparser
 import os
 
+from index_settings import LIVE_FILTER
+
 # 数据库连接定义
 config = configparser.ConfigParser()
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -22,6 +24,10 @@ tar_port = int(config.get("target", "port"))
 tar_user = config.get("target", "user")
 tar_password = config.get("target", "password")
 index_name = config.get("target", "index_name")
+# 排除工单墓碑的过滤别名，查询方通过别名访问宽表
+live_alias = config.get("version", "live_alias", fallback=f"{index_name}_live")
+# 独立索引以外部版本号删除，ES保留已删除版本号的时间
+gc_deletes = config.get("version", "gc_deletes", fallback="1d")
 
 # 日志配置
 logDir = os.path.join(project_root, "log")
@@ -149,6 +155,10 @@ def create_order_index():
                   "format": DATE_FORMAT,
                   "ignore_malformed": True
                 },
+                "BinlogSeq": {"type": "long"},
+                "BinlogDeleted": {"type": "boolean"},
+                # 嵌套元素的删除序号只由脚本读取，不建索引
+                "BinlogRemoved": {"type": "object", "enabled": False},
                 "StatusInfo": {
                   "type": "nested"
                 },
@@ -194,8 +204,9 @@ def create_order_index():
             logger.info(f"已删除现有索引: {index_name}")
             
         # 创建新索引
-        es.indices.create(index=index_name, mappings=mapping["mappings"])
-        logger.success(f"成功创建索引: {index_name}")
+        es.indices.create(index=index_name, mappings=mapping["mappings"],
+                          aliases={live_alias: {"filter": LIVE_FILTER}})
+        logger.success(f"成功创建索引: {index_name}, 过滤别名: {live_alias}")
         return True
     except Exception as e:
         logger.error(f"创建索引失败: {str(e)}")
@@ -247,7 +258,8 @@ def create_operating_info_index(operating_index_name):
             logger.info(f"已删除现有索引: {operating_index_name}")
             
         # 创建新索引
-        es.indices.create(index=operating_index_name, mappings=mapping["mappings"])
+        es.indices.create(index=operating_index_name, mappings=mapping["mappings"],
+                          settings={"index": {"gc_deletes": gc_deletes}})
         logger.success(f"成功创建索引: {operating_index_name}")
         return True
     except Exception as e:
@@ -314,7 +326,8 @@ def create_custspecialconfig_index(custspecialconfig_index_name):
             logger.info(f"已删除现有索引: {custspecialconfig_index_name}")
             
         # 创建新索引
-        es.indices.create(index=custspecialconfig_index_name, mappings=mapping["mappings"])
+        es.indices.create(index=custspecialconfig_index_name, mappings=mapping["mappings"],
+                          settings={"index": {"gc_deletes": gc_deletes}})
         logger.success(f"成功创建索引: {custspecialconfig_index_name}")
         return True
     except Exception as e:
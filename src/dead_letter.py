@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 重放也无法写入的事件记入死信日志后跳过
+
+from loguru import logger
+from typing import Dict, Iterable, Optional
+import configparser
+import datetime
+import json
+import os
+import threading
+
+from metrics import DEAD_LETTERS
+
+config = configparser.ConfigParser()
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+config_path = os.path.join(project_root, "conf", "db.cnf")
+config.read(config_path)
+
+# 死信日志，每行一个JSON记录，包含拒绝原因、ES动作和来源行，修复后可据此补写
+dead_letter_file = config.get("dead_letter", "file", fallback=os.path.join(project_root, "log", "dead_letter.log"))
+
+_lock = threading.Lock()
+
+
+def dead_letter(reason: str, es_action: Optional[Dict] = None, rows: Iterable[Dict] = ()):
+    """记录一个被永久拒绝的事件，调用方视为已处理，检查点照常推进
+
+    Args:
+        reason: 拒绝原因
+        es_action: 被拒绝的ES动作，未能构造动作时为None
+        rows: 来源行数据
+    """
+    rows = [row for row in rows if row is not None]
+    table = rows[0].get('table') if rows else (es_action or {}).get('_index')
+    DEAD_LETTERS.labels(str(table)).inc()
+    source = ", ".join(f"{row.get('table')}:{row.get('Id')}" for row in rows)
+    logger.error(f"事件写入被永久拒绝，记入死信日志后跳过: 来源行=[{source}], {reason}")
+    record = {
+        "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "reason": reason,
+        "action": es_action,
+        "rows": rows,
+    }
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    try:
+        with _lock:
+            os.makedirs(os.path.dirname(dead_letter_file), exist_ok=True)
+            with open(dead_letter_file, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError as e:
+        logger.error(f"写入死信日志失败: {str(e)}, {line}")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 同一工单文档的子表更新合并
+
+from typing import Dict, List, Tuple
+
+from base_processor import RETRY_ON_CONFLICT, nested_op, index_name
+from scripts import NESTED_APPLY_ID, REMOVED_FIELD, SEQ_FIELD, stored_script
+
+
+def _is_newer(current, seq) -> bool:
+    """已有数据的序号不小于本次操作的序号，与脚本中的比较规则相同"""
+    return current is not None and seq is not None and current >= seq
+
+
+class DocumentAggregator:
+    """把一个批次内针对同一工单文档的局部更新和嵌套数组增删合并为一次脚本更新
+
+    宽表文档带有多个嵌套数组，每次脚本更新都会重建整个文档。
+    合并后同一文档在一个批次内只重建一次，只有一个操作的文档保持原动作不变。
+    删除文档等不可合并的动作会截断合并，保证同一文档上的操作顺序不变。
+    """
+    def merge(self, entries: List[Tuple[Dict, List[Dict]]]) -> List[Tuple[Dict, List[Dict]]]:
+        """合并批次中的动作
+
+        Args:
+            entries: (ES动作, 来源事件列表)组成的列表
+
+        Returns:
+            list: 合并后的(ES动作, 来源事件列表)列表
+        """
+        merged: List[Tuple[Dict, List[Dict]]] = []
+        # 文档ID -> 合并动作在结果中的下标
+        groups: Dict[str, int] = {}
+        # 结果下标 -> 收集到的操作列表
+        group_ops: Dict[int, List[Dict]] = {}
+
+        for es_action, sources in entries:
+            op = nested_op(es_action)
+            doc_id = es_action["_id"]
+            if op is None:
+                if es_action["_index"] == index_name:
+                    groups.pop(doc_id, None)
+                merged.append((es_action, sources))
+                continue
+
+            position = groups.get(doc_id)
+            if position is None:
+                groups[doc_id] = len(merged)
+                group_ops[len(merged)] = [op]
+                merged.append((es_action, list(sources)))
+                continue
+
+            group_ops[position].append(op)
+            merged[position][1].extend(sources)
+
+        for position, ops in group_ops.items():
+            first_action, sources = merged[position]
+            if len(ops) > 1:
+                merged[position] = (self._merged_action(first_action, ops), sources)
+            else:
+                # 只有一个操作的文档保持原动作，冲突重试次数与合并后的动作一致
+                first_action["_retry_on_conflict"] = max(first_action.get("_retry_on_conflict", 0), RETRY_ON_CONFLICT)
+        return merged
+
+    def _merged_action(self, first_action: Dict, ops: List[Dict]) -> Dict:
+        """把同一文档的多个操作转换为一次脚本更新"""
+        es_action = {
+            "_op_type": "update",
+            "_index": index_name,
+            "_id": first_action["_id"],
+            "script": stored_script(NESTED_APPLY_ID, {"ops": ops}),
+            # 合并后冲突面更大，统一按ES端重试处理
+            "_retry_on_conflict": max(first_action.get("_retry_on_conflict", 0), RETRY_ON_CONFLICT)
+        }
+        if any(op["type"] != "remove" for op in ops):
+            # 只有删除操作时文档不存在视为成功，不创建空文档
+            es_action["upsert"] = self._build_upsert(ops)
+        return es_action
+
+    @staticmethod
+    def _build_upsert(ops: List[Dict]) -> Dict:
+        """文档不存在时按相同顺序在本地执行操作，得到新建文档的内容"""
+        doc: Dict = {}
+        for op in ops:
+            if op["type"] == "doc":
+                seq = op.get("seq")
+                if seq is not None:
+                    if _is_newer(doc.get(SEQ_FIELD), seq):
+                        continue
+                    doc[SEQ_FIELD] = seq
+                doc.update(op["doc"])
+            elif op["type"] == "upsert":
+                removed = doc.get(REMOVED_FIELD, {}).get(op["field"], {})
+                removed_key = str(op["item"].get(op["key"]))
+                if _is_newer(removed.get(removed_key), op["item"].get(SEQ_FIELD)):
+                    continue
+                removed.pop(removed_key, None)
+                items = doc.setdefault(op["field"], [])
+                for i, item in enumerate(items):
+                    if item.get(op["key"]) == op["item"].get(op["key"]):
+                        if not _is_newer(item.get(SEQ_FIELD), op["item"].get(SEQ_FIELD)):
+                            items[i] = op["item"]
+                        break
+                else:
+                    items.append(op["item"])
+            else:
+                seq = op.get("seq")
+                if seq is not None:
+                    removed = doc.setdefault(REMOVED_FIELD, {}).setdefault(op["field"], {})
+                    removed_key = str(op["value"])
+                    if not _is_newer(removed.get(removed_key), seq):
+                        removed[removed_key] = seq
+                items = doc.get(op["field"])
+                if items:
+                    doc[op["field"]] = [item for item in items if item.get(op["key"]) != op["value"]
+                                        or _is_newer(item.get(SEQ_FIELD), op.get("seq"))]
+        return doc
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 初始化时在内存中组装完整宽表文档
+
+from typing import Dict, Iterator, Optional
+
+from base_processor import RETRY_ON_CONFLICT, index_name
+from handlers import TABLE_SPECS, TableSpec
+from scripts import SNAPSHOT_FILL_ID, stored_script
+
+# 嵌套数组字段名到元素主键字段的映射
+NESTED_KEYS = {spec.target: spec.key for spec in TABLE_SPECS.values() if spec.kind == "nested"}
+
+
+class WideDocumentBuilder:
+    """把一批工单的各表行组装为完整的宽表文档
+
+    顶层字段来自kind为doc的表，嵌套数组来自kind为nested的表，每个文档只产生一个index动作，
+    写入成本不再随子表行数增长。kind为index的表写入独立索引，每行直接产生一个index动作。
+
+    fill_only为True时用于在线初始化：文档以快照补写脚本写入，只补充binlog流尚未写入的顶层字段
+    和嵌套元素；独立索引的行以create写入，已存在(409)说明binlog流已写入较新的数据。
+
+    Args:
+        fill_only: 是否只补写不存在的数据
+    """
+    def __init__(self, fill_only: bool = False):
+        self.fill_only = fill_only
+        self._docs: Dict[str, Dict] = {}
+
+    def add(self, spec: TableSpec, data: Dict) -> Optional[Dict]:
+        """加入一行，kind为index的表返回其index动作，其余返回None"""
+        doc_id = spec.doc_id(data)
+        body = spec.extract(data)
+        if spec.kind == "index":
+            op_type = "create" if self.fill_only else "index"
+            return {"_op_type": op_type, "_index": spec.target, "_id": doc_id, "_source": body}
+        doc = self._docs.setdefault(doc_id, {})
+        if spec.kind == "doc":
+            doc.update(body)
+        else:
+            doc.setdefault(spec.target, []).append(body)
+        return None
+
+    def drain(self) -> Iterator[Dict]:
+        """返回已组装文档的写入动作并清空"""
+        docs, self._docs = self._docs, {}
+        for doc_id, doc in docs.items():
+            if self.fill_only:
+                yield self._fill_action(doc_id, doc)
+            else:
+                yield {"_op_type": "index", "_index": index_name, "_id": doc_id, "_source": doc}
+
+    @staticmethod
+    def _fill_action(doc_id: str, doc: Dict) -> Dict:
+        """快照补写动作，文档不存在时脚本在空文档上执行，文档内容只在参数中传一次"""
+        nested = {field: items for field, items in doc.items() if field in NESTED_KEYS}
+        top = {field: value for field, value in doc.items() if field not in NESTED_KEYS}
+        params = {
+            "doc": top or None,
+            "doc_key": "Id",
+            "nested": nested,
+            "keys": {field: NESTED_KEYS[field] for field in nested},
+        }
+        return {
+            "_op_type": "update",
+            "_index": index_name,
+            "_id": doc_id,
+            # 与binlog流并发更新同一文档，冲突时在ES端重新读取后执行
+            "_retry_on_conflict": RETRY_ON_CONFLICT,
+            "script": stored_script(SNAPSHOT_FILL_ID, params),
+            "scripted_upsert": True,
+            "upsert": {},
+        }
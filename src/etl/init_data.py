@@ -9,17 +9,28 @@ import os
 import argparse
 import datetime
 import configparser
-import json
+import multiprocessing
+import threading
+import time
 import pymysql
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import closing, nullcontext
 from loguru import logger
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, helpers
 
 # 添加项目根目录到系统路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # 导入事件处理器
 from event_processor import EventProcessor
-from utils import dict_to_json
+from handlers import TABLE_SPECS, TableHandler, operating_index_name, custspecialconfig_index_name
+from base_processor import index_name
+from bulk_writer import BulkWriter
+from doc_builder import WideDocumentBuilder
+from backfill_state import BackfillProgress, BackfillState, unit_key
+from index_settings import BulkLoadSettings
+from snapshot_guard import DELETED_ROWS
+from utils import normalize_row
 
 # 配置文件读取
 config = configparser.ConfigParser()
@@ -42,6 +53,32 @@ tar_port = int(config.get("target", "port"))
 tar_user = config.get("target", "user")
 tar_password = config.get("target", "password")
 
+# 批量写入配置
+bulk_enabled = config.getboolean("bulk", "enabled", fallback=False)
+bulk_max_actions = config.getint("bulk", "max_actions", fallback=500)
+bulk_flush_interval = config.getfloat("bulk", "flush_interval", fallback=1.0)
+bulk_aggregate = config.getboolean("bulk", "aggregate", fallback=True)
+
+# 流式读取配置：每次从服务端取回的行数
+init_fetch_size = config.getint("init", "fetch_size", fallback=1000)
+# 并行初始化配置：工单Id空间切分为ranges段，(表, Id段)作为工作单元分发到线程池或进程池
+init_parallel = config.getboolean("init", "parallel", fallback=False)
+init_workers = config.getint("init", "workers", fallback=4)
+init_pool = config.get("init", "pool", fallback="thread")
+init_ranges = config.getint("init", "ranges", fallback=init_workers * 4)
+# 初始化模式：event逐行按binlog事件处理，document按工单批次组装完整宽表文档后批量index
+init_mode = config.get("init", "mode", fallback="event")
+# document模式下并行发送_bulk请求的线程数
+init_bulk_threads = config.getint("init", "bulk_threads", fallback=4)
+# 初始化进度文件，记录已完成的(表, Id段)工作单元，中断后重新运行时跳过
+init_state_file = config.get("init", "state_file", fallback=os.path.join(project_root, "conf", "init_state.json"))
+# 初始化期间目标索引关闭刷新、不写副本，结束或出错时恢复原设置并可选forcemerge
+init_bulk_settings = config.getboolean("init", "bulk_settings", fallback=True)
+init_settings_backup = config.get("init", "settings_backup",
+                                  fallback=os.path.join(project_root, "conf", "index_settings_backup.json"))
+init_forcemerge = config.getboolean("init", "forcemerge", fallback=False)
+init_max_num_segments = config.getint("init", "max_num_segments", fallback=1)
+
 DB_SETTINGS = {
     "host": src_host,
     "port": src_port,
@@ -49,6 +86,8 @@ DB_SETTINGS = {
     "password": src_password,
     "database": src_database,
     "charset": src_charset,
+    # 流式读取时结果集留在服务端，写ES期间连接空闲较久，放宽服务端发送超时
+    "init_command": "SET SESSION net_write_timeout = 600",
 }
 
 ES_SETTINGS = {
@@ -58,160 +97,557 @@ ES_SETTINGS = {
 }
 
 
-def process_table(conn, cursor, processor, table_name, sql_query, order_ids, batch_size=100):
+def build_table_query(spec):
     """
-    处理单个表数据
+    根据表的同步规则生成查询语句
+    
+    Args:
+        spec: 表同步规则
+    
+    Returns:
+        str: SQL查询语句，按工单筛选的表带有{id_placeholder}占位符
+    """
+    sql_query = f"SELECT {', '.join(spec.columns)} FROM {spec.table}"
+    if spec.order_id_column:
+        sql_query += f" WHERE {spec.order_id_column} IN ({{id_placeholder}})"
+    return sql_query
+
+
+def stream_rows(conn, query, args=None, fetch_size=1000):
+    """
+    使用服务端游标逐块读取查询结果，内存中最多保留fetch_size行
+    
+    同一连接上的流式结果集读取完之前不能执行其他查询。
+    
+    Args:
+        conn: 数据库连接
+        query: SQL查询语句
+        args: 查询参数
+        fetch_size: 每次取回的行数
+    
+    Yields:
+        dict: 一行记录
+    """
+    cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+    try:
+        cursor.execute(query, args)
+        while True:
+            records = cursor.fetchmany(fetch_size)
+            if not records:
+                break
+            yield from records
+    finally:
+        # 未读完时close会读取并丢弃剩余结果，连接可继续使用
+        cursor.close()
+
+
+def iter_order_id_batches(conn, start_time, end_time, batch_size=100, id_range=None):
+    """
+    流式读取时间范围内的工单ID，按batch_size分批返回
+    
+    Args:
+        id_range: (起始Id, 结束Id)闭区间，只读取该段内的工单
+    
+    Yields:
+        list: 一批工单ID
+    """
+    id_sql = """
+    SELECT Id 
+    FROM tb_workorderinfo 
+    WHERE CreatedAt BETWEEN %s AND %s
+    """
+    args = [start_time, end_time]
+    if id_range is not None:
+        id_sql += " AND Id BETWEEN %s AND %s"
+        args.extend(id_range)
+    id_sql += " ORDER BY Id"
+    batch = []
+    for record in stream_rows(conn, id_sql, args, init_fetch_size):
+        batch.append(str(record['Id']))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def page_order_id_batches(conn, start_time, end_time, batch_size=100, id_range=None):
+    """
+    按Id分页读取时间范围内的工单ID，每批一次查询
+    
+    每次查询读取完整结果，不占用连接，可以和该批的数据查询在同一个快照事务中交替执行。
+    
+    Args:
+        id_range: (起始Id, 结束Id)闭区间，只读取该段内的工单
+    
+    Yields:
+        list: 一批工单ID
+    """
+    id_sql = "SELECT Id FROM tb_workorderinfo WHERE CreatedAt BETWEEN %s AND %s"
+    args = [start_time, end_time]
+    if id_range is not None:
+        id_sql += " AND Id BETWEEN %s AND %s"
+        args.extend(id_range)
+    last_id = None
+    while True:
+        page_sql, page_args = id_sql, list(args)
+        if last_id is not None:
+            page_sql += " AND Id > %s"
+            page_args.append(last_id)
+        with conn.cursor() as cursor:
+            cursor.execute(page_sql + " ORDER BY Id LIMIT %s", page_args + [batch_size])
+            ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield [str(order_id) for order_id in ids]
+        if len(ids) < batch_size:
+            return
+
+
+def count_orders(conn, start_time, end_time):
+    """时间范围内的工单数"""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM tb_workorderinfo WHERE CreatedAt BETWEEN %s AND %s",
+            (start_time, end_time)
+        )
+        return cursor.fetchone()[0]
+
+
+def split_id_ranges(conn, start_time, end_time, total_count, parts):
+    """
+    把时间范围内的工单Id切分为工单数大致相等的若干段
+    
+    流式读取一遍工单Id，每隔total_count/parts个记录一个边界，Id分布不均匀时也能均衡。
+    
+    Returns:
+        list: [(起始Id, 结束Id), ...]，均为闭区间
+    """
+    step = max(1, -(-total_count // max(1, parts)))
+    id_sql = "SELECT Id FROM tb_workorderinfo WHERE CreatedAt BETWEEN %s AND %s ORDER BY Id"
+    ranges = []
+    range_start = last_id = None
+    count = 0
+    for record in stream_rows(conn, id_sql, (start_time, end_time), init_fetch_size):
+        last_id = record['Id']
+        if range_start is None:
+            range_start = last_id
+        count += 1
+        if count % step == 0:
+            ranges.append((range_start, last_id))
+            range_start = None
+    if range_start is not None:
+        ranges.append((range_start, last_id))
+    return ranges
+
+
+def _str_key(key):
+    """字节类型的键解码为字符串，无法解码时使用十六进制"""
+    if isinstance(key, bytes):
+        try:
+            return key.decode('utf-8')
+        except UnicodeDecodeError:
+            return key.hex()
+    return str(key)
+
+
+def to_event(table_name, record):
+    """
+    把查询到的记录转换为处理器的事件数据
+    
+    Args:
+        table_name: 表名
+        record: 查询到的记录
+    
+    Returns:
+        dict: 事件数据
+    """
+    event = {
+        "schema": src_database,
+        "table": table_name,
+        "action": "update"
+    }
+    event.update(record)
+    
+    # 处理字节类型键，包括字典类型的值中的字节类型键
+    event_processed = {}
+    for key, value in event.items():
+        if isinstance(value, dict):
+            value = {_str_key(k): v for k, v in value.items()}
+        event_processed[_str_key(key)] = value
+    return normalize_row(event_processed)
+
+
+def table_events(conn, table_name, sql_query, id_batches):
+    """
+    流式读取单个表的数据并转换为事件
     
     Args:
         conn: 数据库连接
-        cursor: 数据库游标
-        processor: 事件处理器
         table_name: 表名
         sql_query: SQL查询语句
-        order_ids: 订单ID列表
-        batch_size: 批处理大小
+        id_batches: 工单ID批次的可迭代对象，不按工单筛选的表忽略
+    
+    Yields:
+        dict: 事件数据
+    """
+    if '{id_placeholder}' not in sql_query:
+        for record in stream_rows(conn, sql_query, fetch_size=init_fetch_size):
+            yield to_event(table_name, record)
+        return
+    
+    for batch_num, batch in enumerate(id_batches, 1):
+        logger.info(f"表 {table_name} 处理批次 {batch_num}")
+        # 构建SQL中的IN查询字符串
+        query = sql_query.format(id_placeholder=','.join(['%s'] * len(batch)))
+        for record in stream_rows(conn, query, batch, init_fetch_size):
+            yield to_event(table_name, record)
+
+
+def document_actions(conn, id_batches, fill_only=False):
+    """
+    按工单批次读取全部按工单筛选的表，在内存中组装宽表文档，逐个返回index动作
+    
+    内存中只保留一个批次的文档；查询失败时异常直接抛出，不会用不完整的文档覆盖。
+    
+    Args:
+        conn: 数据库连接
+        id_batches: 工单ID批次的可迭代对象
+        fill_only: 在线初始化时只补写不存在的数据，并跳过binlog流已删除的行
+    
+    Yields:
+        dict: ES写入动作
+    """
+    builder = WideDocumentBuilder(fill_only)
+    specs = [spec for spec in TABLE_SPECS.values() if spec.order_id_column]
+    for batch_num, batch in enumerate(id_batches, 1):
+        logger.info(f"组装工单文档批次 {batch_num}")
+        placeholder = ','.join(['%s'] * len(batch))
+        for spec in specs:
+            query = build_table_query(spec).format(id_placeholder=placeholder)
+            for record in stream_rows(conn, query, batch, init_fetch_size):
+                data = to_event(spec.table, record)
+                if fill_only and DELETED_ROWS.is_deleted(spec, data):
+                    continue
+                action = builder.add(spec, data)
+                if action is not None:
+                    yield action
+        yield from builder.drain()
+
+
+def table_index_actions(conn, spec, fill_only=False):
+    """全表读取写入独立索引的表，逐行返回index动作"""
+    builder = WideDocumentBuilder(fill_only)
+    for record in stream_rows(conn, build_table_query(spec), fetch_size=init_fetch_size):
+        data = to_event(spec.table, record)
+        if fill_only and DELETED_ROWS.is_deleted(spec, data):
+            continue
+        yield builder.add(spec, data)
+
+
+def bulk_index(es_client, actions, unit_name):
+    """
+    使用多个线程并行发送_bulk请求，动作按需从生成器读取
+    
+    Args:
+        es_client: ES客户端
+        actions: ES动作的可迭代对象
+        unit_name: 日志中的名称
     
     Returns:
-        int: 处理的记录数
+        int: 写入成功的文档数
+    
+    Raises:
+        RuntimeError: 有文档写入失败，工作单元不记为完成
     """
-    processed_count = 0
+    success = failed = skipped = 0
+    logger.info(f"开始写入 {unit_name}")
+    for ok, item in helpers.parallel_bulk(es_client, actions, thread_count=init_bulk_threads,
+                                          chunk_size=bulk_max_actions, raise_on_error=False,
+                                          raise_on_exception=False):
+        if ok:
+            success += 1
+            if success % 10000 == 0:
+                logger.info(f"{unit_name} 已写入 {success} 个文档")
+            continue
+        op_type, result = next(iter(item.items()))
+        if op_type == "create" and result.get("status") == 409:
+            # 在线初始化时binlog流已写入该文档
+            skipped += 1
+            continue
+        failed += 1
+        logger.error(f"ES批量{op_type}失败: 索引={result.get('_index')}, ID={result.get('_id')}, {result.get('error')}")
+    if failed:
+        raise RuntimeError(f"{unit_name} 有 {failed} 个文档写入失败")
+    logger.success(f"{unit_name} 写入完成，共 {success} 个文档" + (f"，已存在跳过 {skipped} 个" if skipped else ""))
+    return success
+
+
+def process_document_unit(conn, id_conn, es_client, table_name, id_range, start_time, end_time, batch_size=100,
+                          fill_only=False):
+    """
+    document模式下处理一个工作单元
     
-    if '{id_placeholder}' in sql_query:
-        # 分批处理
-        total_orders = len(order_ids)
-        logger.info(f"表 {table_name} 开始批量处理，总订单数: {total_orders}")
-        
-        batches = [order_ids[i:i + batch_size] for i in range(0, total_orders, batch_size)]
-        batch_num = 1
-        
-        for batch in batches:
-            logger.info(f"表 {table_name} 处理批次 {batch_num}/{len(batches)}")
-            # 构建SQL中的IN查询字符串
-            ids_str = ','.join(['%s'] * len(batch))
-            query = sql_query.format(id_placeholder=ids_str)
-            
-            try:
-                cursor.execute(query, batch)
-                records = cursor.fetchall()
-                
-                for record in records:
-                    event = {
-                        "schema": src_database,
-                        "table": table_name,
-                        "action": "update"
-                    }
-                    event.update(record)
-                    
-                    # 处理字节类型键
-                    event_processed = {}
-                    for key, value in event.items():
-                        # 处理字节类型的键
-                        if isinstance(key, bytes):
-                            try:
-                                str_key = key.decode('utf-8')
-                            except UnicodeDecodeError:
-                                str_key = key.hex()
-                        else:
-                            str_key = str(key)
-                        
-                        # 处理字典类型的值中的字节类型键
-                        if isinstance(value, dict):
-                            new_value = {}
-                            for k, v in value.items():
-                                if isinstance(k, bytes):
-                                    try:
-                                        new_k = k.decode('utf-8')
-                                    except UnicodeDecodeError:
-                                        new_k = k.hex()
-                                else:
-                                    new_k = str(k)
-                                new_value[new_k] = v
-                            event_processed[str_key] = new_value
-                        else:
-                            event_processed[str_key] = value
-                    
-                    json_data = json.loads(dict_to_json(event_processed))
-                    
-                    result = processor.handle_event(
-                        action="update",
-                        data=json_data
-                    )
-                    
-                    if result:
-                        processed_count += 1
-                        if processed_count % 50 == 0:
-                            logger.info(f"表 {table_name} 已处理 {processed_count} 条记录")
-                
-                batch_num += 1
-                
-            except Exception as e:
-                logger.error(f"处理表 {table_name} 批次 {batch_num} 时发生错误: {str(e)}")
+    Args:
+        table_name: 为None时组装id_range内工单的宽表文档，否则把不按工单筛选的表整表写入独立索引
+        id_range: (起始Id, 结束Id)闭区间，为None时不限制
+        fill_only: 在线初始化时只补写不存在的数据
     
+    Returns:
+        int: 写入成功的文档数
+    """
+    if table_name is not None:
+        with closing(table_index_actions(conn, TABLE_SPECS[table_name], fill_only)) as actions:
+            return bulk_index(es_client, actions, table_name)
+    unit_name = f"工单文档[{id_range[0]}-{id_range[1]}]" if id_range else "工单文档"
+    if fill_only:
+        # 在线初始化的工单ID也在conn的快照事务中读取，与文档数据对应同一时刻
+        id_batches = page_order_id_batches(conn, start_time, end_time, batch_size, id_range)
     else:
-        # 全量查询处理
-        logger.info(f"开始处理表 {table_name} 的全量数据")
-        try:
-            cursor.execute(sql_query)
-            records = cursor.fetchall()
-            total_records = len(records)
-            logger.info(f"表 {table_name} 查询到 {total_records} 条记录")
+        id_batches = iter_order_id_batches(id_conn, start_time, end_time, batch_size, id_range)
+    with closing(id_batches), \
+            closing(document_actions(conn, id_batches, fill_only)) as actions:
+        return bulk_index(es_client, actions, unit_name)
+
+
+def start_snapshot(conn):
+    """在连接上开启一致性快照事务，之后的查询都读取开启时刻的数据"""
+    with conn.cursor() as cursor:
+        cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+
+
+def document_units(id_ranges):
+    """document模式的工作单元：每个Id段组装一次文档，不按工单筛选的表各一个单元"""
+    units = [(None, id_range) for id_range in id_ranges]
+    units.extend((table_name, None) for table_name, spec in TABLE_SPECS.items() if not spec.order_id_column)
+    return units
+
+
+def process_table(processor, table_name, events):
+    """
+    处理单个表数据
+    
+    Args:
+        processor: 事件处理器
+        table_name: 表名
+        events: 该表事件数据的可迭代对象
+    
+    Returns:
+        int: 处理的记录数
+    
+    Raises:
+        RuntimeError: 有记录处理失败，工作单元不记为完成
+    """
+    processed_count = 0
+    failed_count = 0
+    started = time.time()
+    logger.info(f"开始处理表 {table_name} 的数据")
+    try:
+        for json_data in events:
+            result = processor.handle_event(
+                action="update",
+                data=json_data
+            )
             
-            for record in records:
-                event = {
-                    "schema": src_database,
-                    "table": table_name,
-                    "action": "update"
-                }
-                event.update(record)
-                
-                # 处理字节类型键
-                event_processed = {}
-                for key, value in event.items():
-                    # 处理字节类型的键
-                    if isinstance(key, bytes):
-                        try:
-                            str_key = key.decode('utf-8')
-                        except UnicodeDecodeError:
-                            str_key = key.hex()
-                    else:
-                        str_key = str(key)
-                    
-                    # 处理字典类型的值中的字节类型键
-                    if isinstance(value, dict):
-                        new_value = {}
-                        for k, v in value.items():
-                            if isinstance(k, bytes):
-                                try:
-                                    new_k = k.decode('utf-8')
-                                except UnicodeDecodeError:
-                                    new_k = k.hex()
-                            else:
-                                new_k = str(k)
-                            new_value[new_k] = v
-                        event_processed[str_key] = new_value
-                    else:
-                        event_processed[str_key] = value
-                
-                json_data = json.loads(dict_to_json(event_processed))
-                
-                result = processor.handle_event(
-                    action="update",
-                    data=json_data
-                )
-                
-                if result:
-                    processed_count += 1
-                    if processed_count % 50 == 0:
-                        logger.info(f"表 {table_name} 已处理 {processed_count} 条记录")
-        
-        except Exception as e:
-            logger.error(f"处理表 {table_name} 全量数据时发生错误: {str(e)}")
+            if not result:
+                failed_count += 1
+                continue
+            processed_count += 1
+            if processed_count % 1000 == 0:
+                rate = processed_count / max(time.time() - started, 1e-6)
+                logger.info(f"表 {table_name} 已处理 {processed_count} 条记录, {rate:.0f} 行/秒")
+    except Exception as e:
+        logger.error(f"处理表 {table_name} 时发生错误: {str(e)}")
+        raise
     
+    if failed_count:
+        raise RuntimeError(f"表 {table_name} 有 {failed_count} 条记录处理失败")
     logger.success(f"表 {table_name} 处理完成，共处理 {processed_count} 条记录")
     return processed_count
 
 
-def init_data(start_time, end_time=None, batch_size=100):
+# 每个工作线程/进程独立的MySQL连接和ES客户端
+_worker_local = threading.local()
+_worker_resources = []
+_worker_resources_lock = threading.Lock()
+
+
+def _get_worker_resources():
+    """当前工作线程的数据库连接和事件处理器，首次调用时创建"""
+    resources = getattr(_worker_local, "resources", None)
+    if resources is None:
+        conn = pymysql.connect(**DB_SETTINGS)
+        id_conn = pymysql.connect(**DB_SETTINGS)
+        es_client = Elasticsearch(**ES_SETTINGS)
+        bulk_writer = BulkWriter(es_client, bulk_max_actions, bulk_flush_interval, bulk_aggregate) if bulk_enabled else None
+        resources = (conn, id_conn, es_client, EventProcessor(es_client, bulk_writer))
+        _worker_local.resources = resources
+        with _worker_resources_lock:
+            _worker_resources.append(resources)
+    return resources
+
+
+def _close_worker_resources():
+    """关闭线程池工作线程创建的连接，进程池的连接随工作进程退出关闭"""
+    with _worker_resources_lock:
+        resources_list, _worker_resources[:] = list(_worker_resources), []
+    for conn, id_conn, es_client, _ in resources_list:
+        conn.close()
+        id_conn.close()
+        es_client.close()
+
+
+def process_unit(table_name, id_range, start_time, end_time, batch_size=100, online=False):
+    """
+    在工作线程/进程中处理一个(表, Id段)工作单元，返回前提交缓冲的ES动作
+    
+    Args:
+        table_name: 表名，document模式下为None表示组装工单文档
+        id_range: (起始Id, 结束Id)闭区间，不按工单筛选的表为None
+        online: 在线初始化，在一致性快照中读取数据并只补写不存在的数据
+    
+    Returns:
+        tuple: (处理的记录数, 耗时秒数)
+    """
+    started = time.time()
+    conn, id_conn, es_client, processor = _get_worker_resources()
+    if online:
+        # 快照在binlog监听的起始位置之后开启，快照之后的变更都由binlog流同步
+        start_snapshot(conn)
+        try:
+            processed = process_document_unit(conn, id_conn, es_client, table_name, id_range, start_time, end_time,
+                                              batch_size, fill_only=True)
+        finally:
+            conn.rollback()
+        return processed, time.time() - started
+    if init_mode == "document":
+        processed = process_document_unit(conn, id_conn, es_client, table_name, id_range, start_time, end_time, batch_size)
+        return processed, time.time() - started
+    sql_query = build_table_query(TABLE_SPECS[table_name])
+    unit_name = f"{table_name}[{id_range[0]}-{id_range[1]}]" if id_range else table_name
+    try:
+        with closing(iter_order_id_batches(id_conn, start_time, end_time, batch_size, id_range)) as id_batches, \
+                closing(table_events(conn, table_name, sql_query, id_batches)) as events:
+            processed = process_table(processor, unit_name, events)
+    finally:
+        # 单元内按数量阈值自动提交的失败数累计到flush返回，出错时也提交，避免缓冲的动作和失败数带入该线程的下一个单元
+        failed = processor.flush()
+    if failed:
+        raise RuntimeError(f"工作单元 {unit_name} 有 {failed} 个ES动作写入失败")
+    return processed, time.time() - started
+
+
+def build_units(id_ranges, online=False):
+    """按Id段和表生成工作单元，在线初始化使用document模式的工作单元"""
+    if online or init_mode == "document":
+        return document_units(id_ranges)
+    units = []
+    for table_name, spec in TABLE_SPECS.items():
+        if spec.order_id_column:
+            units.extend((table_name, id_range) for id_range in id_ranges)
+        else:
+            units.append((table_name, None))
+    return units
+
+
+def run_units(units, start_time, end_time, batch_size, state, progress, online=False):
+    """
+    执行工作单元，开启并行时分发到线程池或进程池，否则在当前线程依次执行
+    
+    每个单元完成后写入进度文件并输出速度和预计剩余时间。
+    
+    Returns:
+        tuple: (处理的记录数, 失败的单元数)
+    """
+    total_processed = 0
+    failed_units = 0
+    
+    def on_done(table_name, id_range, rows, seconds):
+        nonlocal total_processed
+        total_processed += rows
+        state.mark_done(unit_key(table_name, id_range), rows)
+        logger.info(f"初始化进度 {progress.unit_done(table_name, rows, seconds)}")
+    
+    try:
+        if not init_parallel:
+            for table_name, id_range in units:
+                try:
+                    on_done(table_name, id_range,
+                            *process_unit(table_name, id_range, start_time, end_time, batch_size, online))
+                except Exception as e:
+                    failed_units += 1
+                    logger.error(f"工作单元 {unit_key(table_name, id_range)} 处理失败: {str(e)}")
+            return total_processed, failed_units
+        
+        use_process = init_pool == "process" and not online
+        if init_pool == "process" and online:
+            logger.warning("在线初始化需要与binlog监听共用删除记录，使用线程池")
+        logger.info(f"并行初始化: {len(units)} 个工作单元, "
+                    f"{init_workers} 个{'进程' if use_process else '线程'}")
+        if use_process:
+            # 与process_pipeline一致使用spawn，避免fork继承线程持有的锁
+            executor = ProcessPoolExecutor(max_workers=init_workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            executor = ThreadPoolExecutor(max_workers=init_workers)
+        with executor:
+            futures = {
+                executor.submit(process_unit, table_name, id_range, start_time, end_time, batch_size, online):
+                    (table_name, id_range)
+                for table_name, id_range in units
+            }
+            for future in as_completed(futures):
+                table_name, id_range = futures[future]
+                try:
+                    on_done(table_name, id_range, *future.result())
+                except Exception as e:
+                    failed_units += 1
+                    logger.error(f"工作单元 {unit_key(table_name, id_range)} 处理失败: {str(e)}")
+    finally:
+        _close_worker_resources()
+    return total_processed, failed_units
+
+
+def reapply_deletes(es_client, rows):
+    """对在线初始化期间binlog流删除的行重新执行删除，覆盖快照补写回来的数据"""
+    failed = 0
+    for table_name, row in rows:
+        if not TableHandler(es_client, TABLE_SPECS[table_name]).handle("delete", row):
+            failed += 1
+    if failed:
+        logger.error(f"重新执行初始化期间的删除时有 {failed} 行失败")
+    elif rows:
+        logger.info(f"已重新执行初始化期间的 {len(rows)} 行删除")
+
+
+def online_backfill_pending(start_time):
+    """存在参数一致且未完成的在线初始化进度文件"""
+    return BackfillState(init_state_file).resume(start_time, None, "online")
+
+
+def snapshot_position():
+    """
+    读取在线初始化的binlog起始位置，之后开启的快照都不早于该位置
+    
+    Returns:
+        tuple: (log_file, log_pos, gtid_set)，失败时为(None, None, None)
+    """
+    try:
+        with closing(pymysql.connect(**DB_SETTINGS)) as conn, conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute("SHOW MASTER STATUS")
+            binlog_status = cursor.fetchone()
+    except Exception as e:
+        logger.error(f"获取binlog位置时发生错误: {str(e)}")
+        return None, None, None
+    if not binlog_status:
+        logger.warning("无法获取当前binlog位置")
+        return None, None, None
+    gtid_set = (binlog_status.get('Executed_Gtid_Set') or '').replace('\n', '') or None
+    return binlog_status['File'], binlog_status['Position'], gtid_set
+
+
+def init_data(start_time, end_time=None, batch_size=100, online=False):
     """
     根据时间范围初始化工单数据到ElasticSearch
     
@@ -219,8 +655,18 @@ def init_data(start_time, end_time=None, batch_size=100):
         start_time: 开始时间，格式为 YYYY-MM-DD HH:MM:SS
         end_time: 结束时间，格式为 YYYY-MM-DD HH:MM:SS
         batch_size: 每批处理的记录数，默认为100
+        online: 在线初始化，与binlog监听同时运行，调用前需已开始记录binlog流删除的行
+        
+    Returns:
+        tuple: 初始化完成时的(log_file, log_pos, gtid_set)，失败时为(None, None, None)
     """
-    if end_time is None:
+    mode = "online" if online else init_mode
+    state = BackfillState(init_state_file)
+    resumed = state.resume(start_time, end_time, mode)
+    if resumed:
+        # 继续上次的初始化时沿用其结束时间和Id段切分
+        end_time = state.end_time
+    elif end_time is None:
         end_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
     logger.info(f"开始初始化数据，时间范围: {start_time} 至 {end_time}")
@@ -231,107 +677,52 @@ def init_data(start_time, end_time=None, batch_size=100):
         logger.info("数据库连接成功")
     except Exception as e:
         logger.error(f"数据库连接失败: {str(e)}")
-        return None, None
+        if online:
+            DELETED_ROWS.stop()
+        return None, None, None
     
     try:
-        es_client = Elasticsearch(**ES_SETTINGS)
-        logger.info("ElasticSearch连接成功")
-    except Exception as e:
-        logger.error(f"ElasticSearch连接失败: {str(e)}")
-        cursor.close()
-        conn.close()
-        return
-    
-    processor = EventProcessor(es_client)
-    
-    try:
-        id_sql = """
-        SELECT Id 
-        FROM tb_workorderinfo 
-        WHERE CreatedAt BETWEEN %s AND %s
-        ORDER BY Id
-        """
-        cursor.execute(id_sql, (start_time, end_time))
-        id_records = cursor.fetchall()
-        
-        if not id_records:
-            logger.warning("没有找到符合条件的工单数据")
-            return
+        if resumed:
+            id_ranges = state.id_ranges
+            logger.info(f"从进度文件继续初始化，已完成 {state.done_count} 个工作单元: {init_state_file}")
+        else:
+            total_count = count_orders(conn, start_time, end_time)
+            if not total_count:
+                logger.warning("没有找到符合条件的工单数据")
+                return None, None, None
+            logger.info(f"找到符合条件的工单数: {total_count}, 每批 {batch_size} 个")
+            id_ranges = split_id_ranges(conn, start_time, end_time, total_count, init_ranges)
+            state.begin(start_time, end_time, mode, id_ranges)
         
-        order_ids = [str(record['Id']) for record in id_records]
-        total_count = len(order_ids)
-        logger.info(f"找到符合条件的工单数: {total_count}")
-        
-        tables_to_process = {
-            "tb_workorderinfo": """
-            SELECT * 
-            FROM tb_workorderinfo 
-            WHERE Id IN ({id_placeholder})
-            """,
-            "tb_workorderstatus": """
-            SELECT * 
-            FROM tb_workorderstatus 
-            WHERE WorkOrderId IN ({id_placeholder})
-            """,
-            "tb_appointmentconcat": """
-            SELECT * 
-            FROM tb_appointmentconcat 
-            WHERE WorkOrderId IN ({id_placeholder})
-            """,
-            "tb_appointment": """
-            SELECT * 
-            FROM tb_appointment 
-            WHERE WorkOrderId IN ({id_placeholder})
-            """,
-            "tb_workcarinfo": """
-            SELECT * 
-            FROM tb_workcarinfo 
-            WHERE WorkOrderId IN ({id_placeholder})
-            """,
-            "tb_custcolumn": """
-            SELECT * 
-            FROM tb_custcolumn 
-            WHERE WorkOrderId IN ({id_placeholder})
-            """,
-            "basic_custspecialconfig": """
-            SELECT * 
-            FROM basic_custspecialconfig
-            """,
-            "tb_workbussinessjsoninfo": """
-            SELECT Id, WorkOrderId, BussinessJson, InsertTime, Deleted
-            FROM tb_workbussinessjsoninfo 
-            WHERE WorkOrderId IN ({id_placeholder})
-            """,
-            "tb_operatinginfo": """
-            SELECT * 
-            FROM tb_operatinginfo 
-            WHERE WorkOrderId IN ({id_placeholder})
-            """,
-            "tb_recordinfo": """
-            SELECT * 
-            FROM tb_recordinfo 
-            WHERE WorkOrderId IN ({id_placeholder})
-            """,
-            "tb_workserviceinfo": """
-            SELECT * 
-            FROM tb_workserviceinfo 
-            WHERE WorkOrderId IN ({id_placeholder})
-            """,
-            "tb_worksignininfo": """
-            SELECT * 
-            FROM tb_worksignininfo 
-            WHERE WorkOrderId IN ({id_placeholder})
-            """
-        }
-        
-        total_processed = 0
-        for table_name, sql_query in tables_to_process.items():
-            processed = process_table(
-                conn, cursor, processor, 
-                table_name, sql_query, 
-                order_ids, batch_size
-            )
-            total_processed += processed
+        units = build_units(id_ranges, online)
+        pending = [(table_name, id_range) for table_name, id_range in units
+                   if not state.is_done(unit_key(table_name, id_range))]
+        logger.info(f"共 {len(units)} 个工作单元（{len(id_ranges)} 个Id段），待处理 {len(pending)} 个")
+        progress = BackfillProgress(pending, init_workers if init_parallel else 1)
+        if init_bulk_settings and not online:
+            es_client = Elasticsearch(**ES_SETTINGS)
+            settings = BulkLoadSettings(es_client, [index_name, operating_index_name, custspecialconfig_index_name],
+                                        init_settings_backup, init_forcemerge, init_max_num_segments)
+        else:
+            # 在线初始化期间binlog流的写入需要及时可见，不调整索引设置
+            es_client = Elasticsearch(**ES_SETTINGS) if online else None
+            settings = nullcontext()
+        try:
+            with settings:
+                total_processed, failed_units = run_units(pending, start_time, end_time, batch_size, state, progress,
+                                                          online)
+                if failed_units and init_bulk_settings and not online:
+                    # 未全部完成时不forcemerge，重新运行后还会写入
+                    settings.forcemerge = False
+        finally:
+            if online:
+                reapply_deletes(es_client, DELETED_ROWS.stop())
+            if es_client is not None:
+                es_client.close()
+        if failed_units:
+            logger.error(f"有 {failed_units} 个工作单元处理失败，重新运行将从进度文件继续: {init_state_file}")
+            return None, None, None
+        state.finish()
         
         logger.success(f"数据初始化完成，共处理 {total_processed} 条记录")
         
@@ -341,22 +732,25 @@ def init_data(start_time, end_time=None, batch_size=100):
             if binlog_status and len(binlog_status) >= 2:
                 log_file = binlog_status['File']
                 log_pos = binlog_status['Position']
-                logger.info(f"当前binlog位置: {log_file}:{log_pos}")
-                return log_file, log_pos
+                # 开启GTID时一并返回已执行的GTID集合，用于按GTID续传
+                gtid_set = (binlog_status.get('Executed_Gtid_Set') or '').replace('\n', '') or None
+                logger.info(f"当前binlog位置: {log_file}:{log_pos}, GTID集合: {gtid_set}")
+                return log_file, log_pos, gtid_set
             else:
                 logger.warning("无法获取当前binlog位置")
-                return None, None
+                return None, None, None
         except Exception as e:
             logger.error(f"获取binlog位置时发生错误: {str(e)}")
-            return None, None
+            return None, None, None
     
     except Exception as e:
         logger.error(f"数据初始化过程中发生错误: {str(e)}")
-        return None, None
+        return None, None, None
     finally:
+        if online:
+            DELETED_ROWS.stop()
         cursor.close()
         conn.close()
-        es_client.close()
 
 
 def main():
@@ -376,7 +770,7 @@ def main():
         logger.error("时间格式错误，请使用 YYYY-MM-DD HH:MM:SS 格式")
         return
     
-    log_file, log_pos = init_data(args.start, args.end, args.batch)
+    log_file, log_pos, gtid_set = init_data(args.start, args.end, args.batch)
     
     if log_file and log_pos:
         logger.info(f"初始化完成，当前binlog位置: {log_file}:{log_pos}")
@@ -386,6 +780,7 @@ def main():
             config.read(config_path)
             config.set("binlog", "log_file", log_file)
             config.set("binlog", "log_pos", str(log_pos))
+            config.set("binlog", "gtid_set", gtid_set or "")
             config.set("binlog", "init_time", "")  # 清空init_time字段
             with open(config_path, 'w') as f:
                 config.write(f)
@@ -8,49 +8,46 @@ from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import NotFoundError
 from loguru import logger
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 import importlib
 
 # 从基类导入索引名称
 from base_processor import BaseProcessor, index_name
+from scripts import register_scripts
+from metrics import HANDLER_SECONDS
 
 class EventProcessor(BaseProcessor):
     """事件处理器基类，接收JSON数据并根据表名分发到不同的处理方法"""
-    def __init__(self, es_client):
-        super().__init__(es_client)
+    def __init__(self, es_client, bulk_writer=None):
+        super().__init__(es_client, bulk_writer)
         self.handlers = {}
         self._init_handlers()
+        # 嵌套数组脚本以存储脚本方式注册，内容变更后自动以新版本注册
+        register_scripts(es_client)
+
+    def __enter__(self):
+        if self.bulk_writer is not None:
+            self.bulk_writer.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.bulk_writer is not None:
+            self.bulk_writer.close()
+
+    def flush(self) -> int:
+        """提交批量模式下缓冲的ES动作，返回失败的动作数"""
+        if self.bulk_writer is None:
+            return 0
+        return self.bulk_writer.flush()
 
     def _init_handlers(self):
         """延迟导入处理器类，避免循环导入问题"""
-        # 动态导入处理器类
-        from handlers._order_handler import OrderHandler
-        from handlers._status_handler import StatusHandler
-        from handlers._car_handler import CarHandler
-        from handlers._service_handler import ServiceHandler
-        from handlers._record_handler import RecordHandler
-        from handlers._appointment_handler import AppointmentHandler
-        from handlers._appointment_concat_handler import AppointmentConcatHandler
-        from handlers._operating_handler import OperatingHandler
-        from handlers._json_handler import JsonHandler
-        from handlers._column_handler import ColumnHandler
-        from handlers._config_handler import ConfigHandler
-        from handlers._signin_handler import SigninHandler
+        from handlers import TableHandler, TABLE_SPECS
         
-        # 初始化处理器映射
+        # 每张源表按同步规则创建一个通用处理器
         self.handlers = {
-            "tb_workorderinfo": OrderHandler(self.es_client),
-            "tb_workorderstatus": StatusHandler(self.es_client),
-            "tb_workcarinfo": CarHandler(self.es_client),
-            "tb_workserviceinfo": ServiceHandler(self.es_client),
-            "tb_recordinfo": RecordHandler(self.es_client),
-            "tb_appointment": AppointmentHandler(self.es_client),
-            "tb_appointmentconcat": AppointmentConcatHandler(self.es_client),
-            "tb_operatinginfo": OperatingHandler(self.es_client),
-            "tb_workbussinessjsoninfo": JsonHandler(self.es_client),
-            "tb_custcolumn": ColumnHandler(self.es_client),
-            "basic_custspecialconfig": ConfigHandler(self.es_client),
-            "tb_worksignininfo": SigninHandler(self.es_client)
+            table: TableHandler(self.es_client, spec, self.bulk_writer)
+            for table, spec in TABLE_SPECS.items()
         }
 
     def handle_event(self, action: str, data: Dict) -> bool:
@@ -59,12 +56,25 @@ class EventProcessor(BaseProcessor):
             action: 操作类型 (insert, update, delete)
             data: 事件数据
         Returns:
-            bool: 处理是否成功
+            bool: 是否已处理，返回False时需要重放
         """
         table = data.get('table')
         if table in self.handlers:
-            return self.handlers[table].handle(action, data)
+            with HANDLER_SECONDS.labels(table).time():
+                return self.handlers[table].handle(action, data)
+        else:
+            # 没有同步规则的表不写入ES，跳过后检查点照常推进
+            logger.warning(f"未找到表 {table} 的处理器")
+            return True
+
+    def apply_actions(self, action: str, data: Dict, actions: Optional[List[Dict]]) -> bool:
+        """提交已构造好的ES动作，按表名分发到对应处理器"""
+        table = data.get('table')
+        if table in self.handlers:
+            with HANDLER_SECONDS.labels(table).time():
+                return self.handlers[table].apply(action, data, actions)
         else:
+            # 没有同步规则的表不写入ES，跳过后检查点照常推进
             logger.warning(f"未找到表 {table} 的处理器")
-            return False
+            return True
  
\ No newline at end of file
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 按行数和字节数限制容量的读取端到写入端事件队列
+
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+import threading
+import time
+
+
+class BoundedEventQueue:
+    """binlog读取线程和写入线程之间的有界队列
+
+    容量同时按行数和字节数计算，任一超过上限时读取端暂停，直到写入端取走事件。
+    队列为空时总能放入一个事件，单个超大事件不会永久阻塞。
+    记录当前深度、高水位以及读取端被阻塞的累计时间，用于判断瓶颈在读取还是写入。
+    """
+    def __init__(self, max_rows: int = 20000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self._items: Deque[Tuple[Any, int, int]] = deque()
+        self._rows = 0
+        self._bytes = 0
+        self._high_water_rows = 0
+        self._high_water_bytes = 0
+        self._blocked_seconds = 0.0
+        self._blocked_count = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._not_empty = threading.Condition(self._lock)
+
+    def put(self, item: Any, rows: int = 1, size: int = 0) -> bool:
+        """放入事件，队列已满时阻塞
+
+        Returns:
+            bool: 是否已放入，队列关闭后返回False
+        """
+        with self._not_full:
+            if self._is_full(rows, size):
+                started = time.monotonic()
+                self._blocked_count += 1
+                while self._is_full(rows, size):
+                    self._not_full.wait()
+                self._blocked_seconds += time.monotonic() - started
+            if self._closed:
+                return False
+            self._items.append((item, rows, size))
+            self._rows += rows
+            self._bytes += size
+            self._high_water_rows = max(self._high_water_rows, self._rows)
+            self._high_water_bytes = max(self._high_water_bytes, self._bytes)
+            self._not_empty.notify()
+            return True
+
+    def get(self) -> Optional[Any]:
+        """取出事件，队列为空时阻塞；队列关闭且已取完时返回None"""
+        with self._not_empty:
+            while not self._items and not self._closed:
+                self._not_empty.wait()
+            if not self._items:
+                return None
+            item, rows, size = self._items.popleft()
+            self._rows -= rows
+            self._bytes -= size
+            self._not_full.notify()
+            return item
+
+    def close(self):
+        """关闭队列，写入端取完剩余事件后退出，读取端不再放入"""
+        with self._lock:
+            self._closed = True
+            self._not_full.notify_all()
+            self._not_empty.notify_all()
+
+    def stats(self) -> Dict[str, float]:
+        """队列当前深度、高水位和读取端阻塞统计"""
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "rows": self._rows,
+                "bytes": self._bytes,
+                "high_water_rows": self._high_water_rows,
+                "high_water_bytes": self._high_water_bytes,
+                "blocked_seconds": self._blocked_seconds,
+                "blocked_count": self._blocked_count,
+            }
+
+    def _is_full(self, rows: int, size: int) -> bool:
+        if self._closed or not self._items:
+            return False
+        return self._rows + rows > self.max_rows or self._bytes + size > self.max_bytes
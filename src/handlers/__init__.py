@@ -3,30 +3,13 @@
 # @author by wangcw @ 2025
 # comment: handlers模块初始化文件
 
-from ._order_handler import OrderHandler
-from ._record_handler import RecordHandler
-from ._config_handler import ConfigHandler
-from ._appointment_handler import AppointmentHandler
-from ._appointment_concat_handler import AppointmentConcatHandler
-from ._car_handler import CarHandler
-from ._column_handler import ColumnHandler
-from ._json_handler import JsonHandler
-from ._operating_handler import OperatingHandler
-from ._service_handler import ServiceHandler
-from ._signin_handler import SigninHandler
-from ._status_handler import StatusHandler
+from ._table_spec import TableSpec, TABLE_SPECS, operating_index_name, custspecialconfig_index_name
+from ._table_handler import TableHandler
 
 __all__ = [
-    'OrderHandler',
-    'RecordHandler',
-    'ConfigHandler',
-    'AppointmentHandler',
-    'AppointmentConcatHandler',
-    'CarHandler',
-    'ColumnHandler',
-    'JsonHandler',
-    'OperatingHandler',
-    'ServiceHandler',
-    'SigninHandler',
-    'StatusHandler'
-]
\ No newline at end of file
+    'TableSpec',
+    'TABLE_SPECS',
+    'TableHandler',
+    'operating_index_name',
+    'custspecialconfig_index_name'
+]
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 按同步规则处理源表事件的通用处理器
+
+from elasticsearch import Elasticsearch
+from typing import Dict, Optional, List
+from src.base_processor import BaseProcessor
+from src.scripts import SEQ_FIELD
+from ._table_spec import TableSpec
+
+class TableHandler(BaseProcessor):
+    """按TableSpec把源表行事件转换为ES动作"""
+    def __init__(self, es_client: Elasticsearch, spec: TableSpec, bulk_writer=None):
+        super().__init__(es_client, bulk_writer)
+        self.spec = spec
+
+    def build_actions(self, action: str, data: Dict) -> Optional[List[Dict]]:
+        spec = self.spec
+        doc_id = spec.doc_id(data)
+        body = spec.extract(data)
+        # 开启版本号时行数据带有binlog序号，较旧的写入由ES拒绝或由脚本跳过
+        seq = data.get(SEQ_FIELD)
+
+        if spec.kind == "nested":
+            return self._with_retry(self._nested_actions(action, doc_id, spec.target, body, spec.key, seq))
+
+        if spec.kind == "doc":
+            if action in ("insert", "update"):
+                # 宽表顶层字段局部更新，文档不存在时自动创建
+                return self._with_retry([self._doc_upsert_action(doc_id, body, seq=seq)])
+            elif action == "delete":
+                return self._with_retry([self._doc_delete_action(doc_id, seq=seq)])
+            return None
+        if action in ("insert", "update"):
+            return [self._index_action(doc_id, body, index=spec.target, seq=seq)]
+        elif action == "delete":
+            return [self._delete_action(doc_id, index=spec.target, seq=seq)]
+        return None
+
+    def _with_retry(self, actions: Optional[List[Dict]]) -> Optional[List[Dict]]:
+        """主索引上的update按表规则设置冲突重试次数"""
+        for es_action in actions or ():
+            if es_action["_op_type"] == "update":
+                es_action["_retry_on_conflict"] = self.spec.retry_on_conflict
+        return actions
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 源表到ES文档的同步规则定义
+
+from operator import itemgetter
+from typing import Dict, Any, Callable, Optional, Tuple
+from src.base_processor import RETRY_ON_CONFLICT
+from src.utils import process_extra_json
+
+# 独立的操作信息索引名称
+operating_index_name = "operating"
+# 独立的客户特殊配置索引名称
+custspecialconfig_index_name = "custspecialconfig"
+
+
+def _config_value(value: Any) -> Any:
+    """ConfigValue是JSON字符串时解析为对象"""
+    if value and isinstance(value, str) and (value.startswith('{') or value.startswith('[')):
+        return process_extra_json(value)
+    return value
+
+
+class TableSpec:
+    """单个源表的同步规则
+
+    Args:
+        table: 源表名
+        kind: doc写入宽表顶层字段，nested写入宽表嵌套数组，index写入独立索引
+        doc_id_column: 目标文档ID所在列
+        columns: 同步到ES的列，顺序即文档字段顺序
+        target: nested时为数组字段名，index时为索引名
+        key: 嵌套数组元素的主键字段
+        order_id_column: 关联工单Id的列，初始化时按该列筛选，为None时全表同步
+        str_columns: 写入前转换为字符串的列
+        converters: 列名到转换函数的映射
+        retry_on_conflict: 主索引上的update冲突时ES端的重试次数
+    """
+    def __init__(self, table: str, kind: str, doc_id_column: str, columns: Tuple[str, ...],
+                 target: Optional[str] = None, key: str = 'Id', order_id_column: Optional[str] = 'WorkOrderId',
+                 str_columns: Tuple[str, ...] = ('Id', 'WorkOrderId'),
+                 converters: Optional[Dict[str, Callable]] = None,
+                 retry_on_conflict: int = RETRY_ON_CONFLICT):
+        self.table = table
+        self.kind = kind
+        self.doc_id_column = doc_id_column
+        self.columns = tuple(columns)
+        self.target = target
+        self.key = key
+        self.order_id_column = order_id_column
+        self.str_columns = tuple(str_columns)
+        self.converters = dict(converters or {})
+        self.retry_on_conflict = retry_on_conflict
+        self.extract = self._compile()
+
+    def doc_id(self, data: Dict) -> str:
+        """目标文档ID"""
+        return str(data.get(self.doc_id_column))
+
+    def _compile(self) -> Callable[[Dict], Dict]:
+        """启动时把列定义编译为取值函数，避免每行重复构造字典字面量"""
+        columns = self.columns
+        getter = itemgetter(*columns)
+        if len(columns) == 1:
+            single = getter
+            getter = lambda data: (single(data),)
+        conversions = [(i, str) for i, column in enumerate(columns) if column in self.str_columns]
+        conversions += [(columns.index(column), func) for column, func in self.converters.items()]
+
+        def extract(data: Dict) -> Dict:
+            try:
+                values = getter(data)
+            except KeyError:
+                # 缺少部分列时（如只查询了部分字段）回退为逐列取值
+                values = tuple(data.get(column) for column in columns)
+            if conversions:
+                values = list(values)
+                for i, func in conversions:
+                    values[i] = func(values[i])
+            return dict(zip(columns, values))
+
+        return extract
+
+
+TABLE_SPECS: Dict[str, TableSpec] = {spec.table: spec for spec in (
+    TableSpec("tb_workorderinfo", "doc", "Id", (
+        'Id', 'AppCode', 'SourceType', 'OrderType', 'CreateType', 'ServiceProviderCode',
+        'WorkStatus', 'CustomerId', 'CustomerName', 'CustStoreId', 'CustStoreName', 'CustStoreCode',
+        'PreCustStoreId', 'PreCustStoreName', 'CustSettleId', 'CustSettleName', 'IsCustomer',
+        'CustCoopType', 'ProCode', 'ProName', 'CityCode', 'CityName', 'AreaCode', 'AreaName',
+        'InstallAddress', 'InstallTime', 'RequiredTime', 'LinkMan', 'LinkTel', 'SecondLinkTel',
+        'SecondLinkMan', 'WarehouseId', 'WarehouseName', 'Remark', 'IsUrgent', 'CustUniqueSign',
+        'CreatePersonCode', 'CreatePersonName', 'EffectiveTime', 'EffectiveSuccessfulTime',
+        'CreatedById', 'CreatedAt', 'UpdatedById', 'UpdatedAt', 'DeletedById', 'DeletedAt',
+        'Deleted', 'LastUpdateTimeStamp'
+    ), order_id_column='Id', str_columns=('Id',)),
+    TableSpec("tb_workorderstatus", "nested", "WorkOrderId", (
+        'Id', 'WorkOrderId', 'WorkStatus', 'WorkStatusCode', 'NodeCode', 'StepStatus', 'StepName',
+        'PreStepStatus', 'PreStepName', 'IfUninstall', 'TypeStatus', 'SuspendStatus', 'IsSwitch',
+        'IsMixPreOrder', 'ClosePersonName', 'ClosePersonCode', 'ClosedAt', 'IsMigration',
+        'AuditStatus', 'Remark', 'CloseReasonCode', 'CloseReasonName', 'CreatedAt', 'CreatedById',
+        'UpdatedById', 'UpdatedAt', 'DeletedById', 'DeletedAt', 'Deleted'
+    ), target='StatusInfo'),
+    TableSpec("tb_workcarinfo", "nested", "WorkOrderId", (
+        'Id', 'WorkOrderId', 'VinNumber', 'PlateNumber', 'PlateColor', 'EngineNumber', 'CarModelId',
+        'CarModelName', 'CarSeriesId', 'CarSeriesName', 'CarBrandId', 'CarBrandName', 'CarFullName',
+        'Color', 'CarPrice', 'IsNewCar', 'CarType', 'UserName', 'UserTel', 'UserCityCode',
+        'UserCityName', 'UserAddress', 'Remark', 'ShortVin', 'ShortFourVin', 'CreatedById',
+        'CreatedAt', 'UpdatedById', 'UpdatedAt', 'DeletedById', 'DeletedAt', 'Deleted'
+    ), target='CarInfo', retry_on_conflict=3),
+    TableSpec("tb_workserviceinfo", "nested", "WorkOrderId", (
+        'Id', 'WorkOrderId', 'ServiceType', 'AreaType', 'Privoder', 'InstitutionCode',
+        'IsSelfService', 'ServiceId', 'ServiceCode', 'ServiceName', 'WorkerId', 'WorkerCode',
+        'WorkerName', 'IsPreInstall', 'CarServiceRelation', 'CompleteTime', 'Remark', 'CreatedById',
+        'CreatedAt', 'UpdatedById', 'UpdatedAt', 'DeletedById', 'DeletedAt', 'Deleted',
+        'LastUpdateTimeStamp'
+    ), target='ServiceInfo', str_columns=('WorkOrderId',)),
+    TableSpec("tb_recordinfo", "nested", "WorkOrderId", (
+        'Id', 'WorkOrderId', 'CompleteTime', 'RecordPersonCode', 'RecordPersonName', 'Remark',
+        'InsertTime', 'Deleted'
+    ), target='RecordInfo'),
+    TableSpec("tb_appointment", "nested", "WorkOrderId", (
+        'Id', 'WorkOrderId', 'AppCode', 'AppointStatus', 'AppointSource', 'OrderTime',
+        'AppointTime', 'OperatorCode', 'OperatorName', 'FailCode', 'FailText', 'ApplyReason',
+        'ApplyCode', 'ProCode', 'ProName', 'CityCode', 'CityName', 'AreaCode', 'AreaName',
+        'NextContactTime', 'InstallAddress', 'ChangeRemark', 'Remark', 'ExtraJson', 'CreatedById',
+        'CreatedAt', 'UpdatedById', 'UpdatedAt', 'DeletedById', 'DeletedAt', 'Deleted'
+    ), target='AppointInfo'),
+    TableSpec("tb_appointmentconcat", "nested", "WorkOrderId", (
+        'Id', 'WorkOrderId', 'FirstAppointTime', 'FirstSubmitTime', 'CorrectiveAppointTime',
+        'LastRemark', 'AppCode', 'AppointStatus', 'LastAppointTime', 'RemarkConcat',
+        'CustRemarkConcat', 'CallRemarkConcat', 'ApplyReason', 'ApplyCode', 'CreatedById',
+        'CreatedAt', 'UpdatedById', 'UpdatedAt', 'DeletedById', 'DeletedAt', 'Deleted'
+    ), target='ConcatInfo', str_columns=('Id',)),
+    TableSpec("tb_operatinginfo", "index", "Id", (
+        'Id', 'WorkOrderId', 'OperId', 'AppCode', 'OperCode', 'OperName', 'TagType', 'InsertTime',
+        'Deleted'
+    ), target=operating_index_name),
+    TableSpec("tb_workbussinessjsoninfo", "nested", "WorkOrderId", (
+        'Id', 'WorkOrderId', 'BussinessJson', 'InsertTime', 'Deleted'
+    ), target='JsonInfo', str_columns=('Id', 'WorkOrderId', 'BussinessJson')),
+    TableSpec("tb_custcolumn", "nested", "WorkOrderId", (
+        'Id', 'WorkOrderId', 'TypeCode', 'TypeName', 'Value', 'InsertTime', 'Deleted'
+    ), target='ColumnInfo'),
+    TableSpec("basic_custspecialconfig", "index", "Id", (
+        'Id', 'CustomerId', 'CustomerName', 'ConfigType', 'ConfigKey', 'ConfigValue', 'Remark',
+        'IsEnabled', 'CreatedById', 'CreatedAt', 'UpdatedById', 'UpdatedAt', 'DeletedById',
+        'DeletedAt', 'Deleted'
+    ), target=custspecialconfig_index_name, order_id_column=None, str_columns=('Id', 'CustomerId'),
+        converters={'ConfigValue': _config_value}),
+    TableSpec("tb_worksignininfo", "nested", "WorkOrderId", (
+        'Id', 'WorkOrderId', 'OrgCode', 'SignType', 'SignTime', 'SignLng', 'SignLat', 'SignAddr',
+        'OriginalAddr', 'SignAddrDistance', 'LastSignDistance', 'InitialLng', 'InitialLat', 'IMEI',
+        'Remark', 'CreatedById', 'CreatedAt', 'UpdatedById', 'UpdatedAt', 'DeletedById',
+        'DeletedAt', 'Deleted'
+    ), target='SigninInfo'),
+)}
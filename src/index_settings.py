@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 批量导入期间临时调整索引设置
+
+from elasticsearch import Elasticsearch
+from loguru import logger
+from typing import Dict, List, Optional
+import json
+import os
+import sys
+
+from checkpoint import atomic_write
+
+# 批量导入期间使用的设置：关闭定时刷新，不写副本
+BULK_LOAD_SETTINGS = {"refresh_interval": "-1", "number_of_replicas": 0}
+
+# 开启版本号时宽表文档上由脚本维护的字段，嵌套元素的删除记录按主键存放，不建索引以免动态生成字段
+VERSION_MAPPING = {
+    "BinlogSeq": {"type": "long"},
+    "BinlogDeleted": {"type": "boolean"},
+    "BinlogRemoved": {"type": "object", "enabled": False},
+}
+
+
+def ensure_version_mapping(es_client: Elasticsearch, index: str) -> bool:
+    """为已存在的宽表索引补充版本号字段的映射，字段已存在且一致时ES直接返回"""
+    try:
+        es_client.indices.put_mapping(index=index, body={"properties": VERSION_MAPPING})
+        return True
+    except Exception as e:
+        logger.error(f"补充索引 {index} 的版本号字段映射失败: {str(e)}")
+        return False
+
+
+# 排除工单墓碑的过滤条件，查询宽表时通过带此过滤条件的别名访问
+LIVE_FILTER = {"bool": {"must_not": [{"term": {"BinlogDeleted": True}}]}}
+
+
+def ensure_live_alias(es_client: Elasticsearch, index: str, alias: str) -> bool:
+    """为宽表索引创建排除墓碑文档的过滤别名，别名已存在时覆盖其过滤条件"""
+    try:
+        es_client.indices.put_alias(index=index, name=alias, body={"filter": LIVE_FILTER})
+        return True
+    except Exception as e:
+        logger.error(f"创建索引 {index} 的过滤别名 {alias} 失败: {str(e)}")
+        return False
+
+
+def ensure_gc_deletes(es_client: Elasticsearch, indices: List[str], gc_deletes: str) -> bool:
+    """设置以外部版本号删除的索引保留已删除版本号的时间
+
+    ES只在gc_deletes时间内记得已删除文档的版本号，超过后重放的旧写入会重新创建文档，
+    时间需覆盖进程停止到重放结束的最长间隔。
+    """
+    result = True
+    for index in indices:
+        try:
+            if not es_client.indices.exists(index=index):
+                continue
+            es_client.indices.put_settings(index=index, body={"index": {"gc_deletes": gc_deletes}})
+            logger.info(f"索引 {index} 已设置gc_deletes={gc_deletes}")
+        except Exception as e:
+            result = False
+            logger.error(f"设置索引 {index} 的gc_deletes失败: {str(e)}")
+    return result
+
+
+def purge_tombstones(es_client: Elasticsearch, index: str, before_seq: int) -> Optional[int]:
+    """删除序号小于before_seq的工单墓碑，返回删除的文档数，失败时返回None
+
+    重放从检查点开始，序号早于检查点一定范围的写入不会再到达，对应的墓碑可以清理。
+    """
+    query = {"bool": {"filter": [
+        {"term": {"BinlogDeleted": True}},
+        {"range": {"BinlogSeq": {"lt": before_seq}}},
+    ]}}
+    try:
+        response = es_client.delete_by_query(index=index, body={"query": query}, conflicts="proceed",
+                                             request_timeout=3600)
+        deleted = response.get("deleted", 0)
+        logger.info(f"索引 {index} 已清理墓碑文档 {deleted} 条, 序号早于 {before_seq}")
+        return deleted
+    except Exception as e:
+        logger.error(f"清理索引 {index} 的墓碑文档失败: {str(e)}")
+        return None
+
+
+class BulkLoadSettings:
+    """批量导入期间把索引切换为导入设置，结束或出错时恢复原设置
+
+    原设置先写入备份文件再修改索引。进程被强制结束时备份文件保留，下次进入时
+    以备份文件中的设置为原设置，不会把导入设置误当作原设置。恢复完成后删除备份文件。
+
+    Args:
+        es_client: ES客户端
+        indices: 目标索引，不存在的索引跳过
+        backup_path: 原设置备份文件
+        forcemerge: 恢复后是否执行forcemerge
+        max_num_segments: forcemerge合并后的段数
+    """
+    def __init__(self, es_client: Elasticsearch, indices: List[str], backup_path: str,
+                 forcemerge: bool = False, max_num_segments: int = 1):
+        self.es_client = es_client
+        self.indices = indices
+        self.backup_path = backup_path
+        self.forcemerge = forcemerge
+        self.max_num_segments = max_num_segments
+        self.previous: Dict[str, Dict[str, Optional[str]]] = {}
+
+    def __enter__(self):
+        self.previous = self._load_backup()
+        for index in self.indices:
+            if index in self.previous:
+                continue
+            if not self.es_client.indices.exists(index=index):
+                logger.warning(f"索引 {index} 不存在，跳过导入设置")
+                continue
+            self.previous[index] = self._current_settings(index)
+        atomic_write(self.backup_path, json.dumps(self.previous, ensure_ascii=False))
+
+        try:
+            for index in self.previous:
+                self.es_client.indices.put_settings(index=index, body={"index": BULK_LOAD_SETTINGS})
+                logger.info(f"索引 {index} 已切换为批量导入设置: {BULK_LOAD_SETTINGS}, 原设置: {self.previous[index]}")
+        except Exception:
+            # 异常离开__enter__时with不会调用__exit__，先恢复已切换的索引再抛出，写回原设置对未切换的索引无影响
+            self.__exit__(*sys.exc_info())
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        restored = True
+        for index, settings in self.previous.items():
+            try:
+                # 值为None时恢复为ES默认值
+                self.es_client.indices.put_settings(index=index, body={"index": settings})
+                logger.info(f"索引 {index} 已恢复设置: {settings}")
+            except Exception as e:
+                restored = False
+                logger.error(f"恢复索引 {index} 设置时发生错误，原设置保留在 {self.backup_path}: {str(e)}")
+        if restored and os.path.exists(self.backup_path):
+            os.remove(self.backup_path)
+
+        if self.forcemerge and exc_type is None:
+            for index in self.previous:
+                try:
+                    logger.info(f"索引 {index} 开始forcemerge, max_num_segments={self.max_num_segments}")
+                    self.es_client.indices.forcemerge(index=index, max_num_segments=self.max_num_segments,
+                                                      request_timeout=3600)
+                    logger.info(f"索引 {index} forcemerge完成")
+                except Exception as e:
+                    logger.error(f"索引 {index} forcemerge时发生错误: {str(e)}")
+
+    def _current_settings(self, index: str) -> Dict[str, Optional[str]]:
+        """读取需要调整的设置项，未显式设置的项记为None"""
+        response = self.es_client.indices.get_settings(index=index, name=list(
+            f"index.{key}" for key in BULK_LOAD_SETTINGS
+        ))
+        current = next(iter(response.values()), {}).get("settings", {}).get("index", {})
+        return {key: current.get(key) for key in BULK_LOAD_SETTINGS}
+
+    def _load_backup(self) -> Dict[str, Dict[str, Optional[str]]]:
+        """读取上次未能恢复的原设置"""
+        if not os.path.exists(self.backup_path):
+            return {}
+        try:
+            with open(self.backup_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+            logger.warning(f"发现未恢复的索引设置备份，以其作为原设置: {self.backup_path}")
+            return previous
+        except Exception as e:
+            logger.error(f"读取索引设置备份时发生错误: {str(e)}")
+            return {}
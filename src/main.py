@@ -8,17 +8,18 @@ import sys
 import os
 import configparser
 from loguru import logger
-import json
 import pymysql
 import time
-import argparse
+import asyncio
 from elasticsearch import Elasticsearch
-from utils import dict_to_str, dict_to_json
+from row_converter import RowConverterCache
 import threading
+from contextlib import nullcontext
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from pymysqlreplication import BinLogStreamReader
+from pymysqlreplication.event import GtidEvent, HeartbeatLogEvent, RotateEvent, XidEvent
 from pymysqlreplication.row_event import (
     DeleteRowsEvent,
     UpdateRowsEvent,
@@ -26,7 +27,21 @@ from pymysqlreplication.row_event import (
 )
 
 from event_processor import EventProcessor
+from bulk_writer import BulkWriter
+from coalescer import EventCoalescer
+from parallel_apply import ParallelApplier
+from process_pipeline import ProcessPipeline
+from scripts import register_scripts
+from checkpoint import CheckpointStore
+from event_queue import BoundedEventQueue
+from metrics import EVENTS, observe_event, observe_queue, start_metrics_server
+from replication_source import TransactionTracker, binlog_sequence, gtid_set_at, parse_hosts, select_source
 from monitor import BinlogMonitor
+from snapshot_guard import DELETED_ROWS
+from index_settings import ensure_gc_deletes, ensure_live_alias, ensure_version_mapping, purge_tombstones
+from base_processor import index_name
+from handlers import TABLE_SPECS
+from scripts import REMOVED_RETENTION, SEQ_FIELD
 
 # 数据库连接定义
 config = configparser.ConfigParser()
@@ -42,6 +57,11 @@ src_user = config.get("source", "user")
 src_password = config.get("source", "password")
 src_port = int(config.get("source", "port"))
 src_charset = config.get("source", "charset")
+# 候选源库列表，按顺序选择包含已同步GTID集合的源库，未配置时只使用host:port
+src_hosts = parse_hosts(config.get("source", "hosts", fallback=f"{src_host}:{src_port}"), src_port)
+src_retry_interval = config.getfloat("source", "retry_interval", fallback=5.0)
+# 连续重连都没有推进检查点时，重连间隔从retry_interval起倍增，不超过max_retry_interval
+src_max_retry_interval = config.getfloat("source", "max_retry_interval", fallback=300.0)
 
 # 目标ElasticSearch配置
 tar_host = config.get("target", "host")
@@ -52,6 +72,66 @@ tar_password = config.get("target", "password")
 # binlog起始位点
 bin_log_file = config.get("binlog", "log_file")
 bin_log_pos = int(config.get("binlog", "log_pos"))
+# 复制心跳间隔（秒），源库空闲时按该间隔发送心跳，0表示不开启
+bin_heartbeat = config.getfloat("binlog", "heartbeat", fallback=0)
+# 开启心跳时超过该秒数没有收到任何事件视为连接挂起
+bin_hung_timeout = config.getfloat("monitor", "hung_timeout", fallback=max(bin_heartbeat * 3, 30))
+# 已同步的GTID集合，存在且开启auto_position时按GTID续传，可在源库切换后继续同步
+bin_gtid_set = config.get("binlog", "gtid_set", fallback="") or None
+gtid_auto_position = config.getboolean("binlog", "auto_position", fallback=True)
+
+# 外部版本号：按binlog坐标为每行生成递增序号，重放或乱序到达的旧数据由ES拒绝
+version_enabled = config.getboolean("version", "enabled", fallback=False)
+# 删除的工单在宽表中留下墓碑，查询方通过该过滤别名访问宽表以排除墓碑
+version_live_alias = config.get("version", "live_alias", fallback=f"{index_name}_live")
+# 独立索引以外部版本号删除，ES保留已删除版本号的时间，需覆盖进程停止到重放结束的最长间隔
+version_gc_deletes = config.get("version", "gc_deletes", fallback="1d")
+# 启动时清理早于检查点的墓碑文档
+version_purge = config.getboolean("version", "purge_tombstones", fallback=True)
+
+# 检查点配置，位点只在之前的事件全部被ES确认后保存
+checkpoint_path = os.path.join(project_root, config.get("checkpoint", "file", fallback="conf/checkpoint.json"))
+checkpoint_interval = config.getfloat("checkpoint", "interval", fallback=1.0)
+checkpoint_store = CheckpointStore(checkpoint_path, checkpoint_interval)
+
+# 批量写入配置
+bulk_enabled = config.getboolean("bulk", "enabled", fallback=False)
+bulk_max_actions = config.getint("bulk", "max_actions", fallback=500)
+bulk_flush_interval = config.getfloat("bulk", "flush_interval", fallback=1.0)
+bulk_aggregate = config.getboolean("bulk", "aggregate", fallback=True)
+
+# 行事件合并配置
+coalesce_enabled = config.getboolean("coalesce", "enabled", fallback=False)
+coalesce_window = config.getfloat("coalesce", "window", fallback=0.3)
+coalesce_max_keys = config.getint("coalesce", "max_keys", fallback=5000)
+
+# 并行写入配置
+parallel_enabled = config.getboolean("parallel", "enabled", fallback=False)
+parallel_workers = config.getint("parallel", "workers", fallback=4)
+parallel_queue_size = config.getint("parallel", "queue_size", fallback=1000)
+
+# 读取端和写入端之间的事件队列配置，按行数和字节数限制容量
+queue_enabled = config.getboolean("queue", "enabled", fallback=False)
+queue_max_rows = config.getint("queue", "max_rows", fallback=20000)
+queue_max_bytes = config.getint("queue", "max_bytes", fallback=64 * 1024 * 1024)
+queue_stats_interval = config.getfloat("queue", "stats_interval", fallback=60.0)
+
+# 多进程转换配置，开启后行数据转换和ES动作构造在进程池中执行
+process_enabled = config.getboolean("process", "enabled", fallback=False)
+process_workers = config.getint("process", "workers", fallback=2)
+process_batch_size = config.getint("process", "batch_size", fallback=500)
+
+# asyncio模式配置，开启后使用AsyncElasticsearch处理事件
+async_enabled = config.getboolean("async", "enabled", fallback=False)
+async_max_in_flight = config.getint("async", "max_in_flight", fallback=200)
+async_queue_size = config.getint("async", "queue_size", fallback=1000)
+
+# 在线初始化：从记录的binlog位置立即开始监听，历史数据在后台线程中从快照补写
+init_online = config.getboolean("init", "online", fallback=False)
+
+# 监控指标服务配置
+metrics_enabled = config.getboolean("metrics", "enabled", fallback=False)
+metrics_port = config.getint("metrics", "port", fallback=9108)
 
 # 日志级别
 log_level = config.get("log", "level")
@@ -86,7 +166,9 @@ SRC_MYSQL_SETTINGS = {
 ES_SETTINGS = {
     "hosts": [f"http://{tar_host}:{tar_port}"],
     "http_auth": (tar_user, tar_password) if tar_user and tar_password else None,
-    "timeout": 30
+    "timeout": 30,
+    # 并行写入时每个工作线程都需要独立的HTTP连接
+    "maxsize": max(parallel_workers, 10) if parallel_enabled else 10
 }
 
 
@@ -141,103 +223,523 @@ def update_binlog_config(log_file, log_pos):
         return False
 
 
-def start_binlog_listener(log_file, log_pos):
-    """启动binlog监听
+def clear_init_time():
+    """清空配置文件中的init_time，重启后不再初始化"""
+    try:
+        config = configparser.ConfigParser()
+        config.read(config_path)
+        config.set("binlog", "init_time", "")
+        with open(config_path, 'w') as f:
+            config.write(f)
+        logger.info("已清空配置文件中的init_time")
+    except Exception as e:
+        logger.error(f"更新配置文件时发生错误: {str(e)}")
+
+
+def start_online_init(init_time):
+    """在线初始化：记录binlog位置后由调用方立即从该位置开始监听，历史数据在后台线程中补写
     
-    Args:
-        log_file: binlog文件名
-        log_pos: binlog位置
+    每个工作单元的快照都在记录位置之后开启，快照之后的变更全部由binlog流同步。
+    快照只补写binlog流尚未写入的文档、顶层字段和嵌套元素，两者写入同一数据时以binlog流为准。
+    上次在线初始化未完成时从检查点继续监听，未完成的工作单元重新开启快照补写。
+    
+    Returns:
+        tuple: 监听起始的(log_file, log_pos, gtid_set)，失败时返回None
     """
-    logger.info(f"开始监听binlog，起始位置: {log_file}:{log_pos}")
+    from etl.init_data import online_backfill_pending, snapshot_position
+    checkpoint = checkpoint_store.load()
+    if checkpoint and online_backfill_pending(init_time):
+        position = (checkpoint["log_file"], checkpoint["log_pos"], checkpoint.get("gtid_set") or bin_gtid_set)
+        logger.info(f"继续上次未完成的在线初始化，从检查点启动监听: {position[0]}:{position[1]}")
+    else:
+        position = snapshot_position()
+        if not position[0]:
+            return None
+        logger.info(f"在线初始化，从当前binlog位置启动监听: {position[0]}:{position[1]}")
+        update_binlog_config(position[0], position[1])
+        checkpoint_store.save(*position, force=True)
     
-    # 创建binlog流读取器
-    stream = BinLogStreamReader(
-        connection_settings=SRC_MYSQL_SETTINGS,
+    # 先开始记录删除再启动监听，快照补写时跳过binlog流已删除的行
+    DELETED_ROWS.start()
+    backfill = threading.Thread(target=_run_online_init, args=(init_time,), daemon=True, name="online-init")
+    backfill.start()
+    return position
+
+
+def _run_online_init(init_time):
+    from etl.init_data import init_data
+    log_file, _, _ = init_data(init_time, online=True)
+    if log_file:
+        logger.success("在线初始化完成")
+        clear_init_time()
+    else:
+        logger.error("在线初始化未完成，重启后从进度文件继续")
+
+
+_monitor = None
+
+
+def get_monitor():
+    """创建监控实例并启动监控线程，只在第一次调用时创建"""
+    global _monitor
+    if _monitor is None:
+        _monitor = BinlogMonitor()
+        monitor_thread = threading.Thread(target=_monitor.start_monitoring)
+        monitor_thread.daemon = True
+        monitor_thread.start()
+    return _monitor
+
+
+def create_binlog_stream(log_file, log_pos, gtid_set=None, settings=SRC_MYSQL_SETTINGS):
+    """创建binlog流读取器，有GTID集合时按GTID续传，否则按文件位点续传"""
+    if gtid_set and gtid_auto_position:
+        position = {"auto_position": gtid_set}
+    else:
+        position = {"log_file": log_file, "log_pos": log_pos}
+    if bin_heartbeat:
+        # 连接挂起时读取超时返回，而不是一直阻塞在socket上
+        settings = {**settings, "read_timeout": bin_hung_timeout}
+    return BinLogStreamReader(
+        connection_settings=settings,
         server_id=3,
         blocking=True,  # 持续监听
-        only_events=[DeleteRowsEvent, WriteRowsEvent, UpdateRowsEvent],  # 指定只监听某些事件
+        # 行事件之外读取GTID、事务提交、心跳和binlog切换事件，用于确定可安全续传的位置
+        only_events=[DeleteRowsEvent, WriteRowsEvent, UpdateRowsEvent, GtidEvent, XidEvent,
+                     HeartbeatLogEvent, RotateEvent],
+        slave_heartbeat=bin_heartbeat or None,
         only_schemas=src_database,  # 指定只监听某些库（但binlog还是要读取全部）
         only_tables=src_tables,  # 指定监听某些表
-        log_file=log_file,  # 指定起始binlog文件
-        log_pos=log_pos  # 指定起始位点
+        **position
     )
 
+
+ROW_EVENTS = (WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent)
+
+
+class StreamHungError(Exception):
+    """binlog连接在心跳超时时间内没有收到任何事件"""
+
+
+class WriteFailedError(Exception):
+    """有事件未被ES确认，不保存检查点，从最近的检查点重新连接"""
+
+
+def row_action(binlog_event):
+    """binlog行事件对应的操作类型和行镜像所在的键"""
+    if isinstance(binlog_event, WriteRowsEvent):
+        return "insert", "values"
+    elif isinstance(binlog_event, UpdateRowsEvent):
+        return "update", "after_values"
+    return "delete", "values"
+
+
+def row_events(binlog_event, converter, log_file, log_pos):
+    """把binlog行事件拆分为逐行的(操作类型, 行数据)，开启版本号时行数据带上binlog序号"""
+    action, values_key = row_action(binlog_event)
+    EVENTS.labels(binlog_event.table, action).inc(len(binlog_event.rows))
+    for row_index, row in enumerate(binlog_event.rows):
+        data = converter.convert(row[values_key])
+        if version_enabled:
+            data[SEQ_FIELD] = binlog_sequence(log_file, log_pos, binlog_event.event_size, row_index)
+        if DELETED_ROWS.active:
+            DELETED_ROWS.observe(binlog_event.table, action, data)
+        yield action, data
+
+
+def retry_delay(retries):
+    """第retries次连续重连前的等待秒数，按指数退避，有上限"""
+    return min(src_retry_interval * 2 ** max(retries - 1, 0), src_max_retry_interval)
+
+
+def run_binlog_listener(log_file, log_pos, gtid_set=None):
+    """启动binlog监听，连接中断后从最近的检查点重新连接
+    
+    有GTID集合时按src_hosts的顺序选择已包含该集合的源库，源库切换后无需重新初始化数据。
+    只有文件位点时先由第一个源库的binlog计算截至该位点的GTID集合，之后的检查点都带上GTID集合。
+    
+    Args:
+        log_file: binlog文件名
+        log_pos: binlog位置
+        gtid_set: 已同步的GTID集合
+    """
+    listener = start_async_binlog_listener if async_enabled else start_binlog_listener
+    gtid_checked = gtid_set is not None or not gtid_auto_position
+    # 连续没有推进检查点的重连次数
+    retries = 0
+    while True:
+        if not gtid_checked:
+            host, port = src_hosts[0]
+            try:
+                gtid_set = gtid_set_at({**SRC_MYSQL_SETTINGS, "host": host, "port": port}, log_file, log_pos)
+                gtid_checked = True
+                if gtid_set is None:
+                    logger.warning(f"源库 {host}:{port} 未开启GTID，只能按文件位点续传，不支持切换源库")
+                else:
+                    logger.info(f"起始位置 {log_file}:{log_pos} 的GTID集合: {gtid_set}")
+            except Exception as e:
+                retries += 1
+                logger.error(f"计算起始位置 {log_file}:{log_pos} 的GTID集合时发生错误: {str(e)}，"
+                             f"{retry_delay(retries)}秒后重试")
+                time.sleep(retry_delay(retries))
+                continue
+        settings = select_source(src_hosts, SRC_MYSQL_SETTINGS, gtid_set if gtid_auto_position else None)
+        if settings is None:
+            retries += 1
+            delay = retry_delay(retries)
+            logger.error(f"没有包含GTID集合 {gtid_set} 的可用源库，{delay}秒后重试")
+        elif not listener(log_file, log_pos, gtid_set, settings):
+            break
+        else:
+            position = (log_file, log_pos)
+            checkpoint = checkpoint_store.load()
+            if checkpoint:
+                log_file, log_pos = checkpoint["log_file"], checkpoint["log_pos"]
+                gtid_set = checkpoint.get("gtid_set") or gtid_set
+            # 检查点推进说明上次连接期间写入正常，否则退避，避免ES持续不可用时反复重放
+            retries = 0 if (log_file, log_pos) != position else retries + 1
+            delay = retry_delay(retries)
+            logger.warning(f"binlog监听中断，{delay}秒后从 {log_file}:{log_pos} 重新连接")
+        time.sleep(delay)
+
+
+def start_binlog_listener(log_file, log_pos, gtid_set=None, settings=SRC_MYSQL_SETTINGS):
+    """启动binlog监听
+    
+    Args:
+        log_file: binlog文件名
+        log_pos: binlog位置
+        gtid_set: 已同步的GTID集合
+        settings: 源库连接配置
+        
+    Returns:
+        bool: 是否因错误中断，需要重新连接
+    """
+    logger.info(f"开始监听binlog，源库: {settings['host']}:{settings['port']}，"
+                f"起始位置: {log_file}:{log_pos}，GTID集合: {gtid_set}")
+    
+    # 创建binlog流读取器
+    stream = create_binlog_stream(log_file, log_pos, gtid_set, settings)
+
     # 创建ElasticSearch连接
     es_client = Elasticsearch(**ES_SETTINGS)
     
-    # 创建统一的事件处理器
-    processor = EventProcessor(es_client)
-    
-    # 创建监控实例
-    monitor = BinlogMonitor()
-    
-    # 启动监控线程
-    monitor_thread = threading.Thread(target=monitor.start_monitoring)
-    monitor_thread.daemon = True
-    monitor_thread.start()
-    
-    # 记录上次记录binlog位置的时间
-    last_log_time = time.time()
-    # 记录binlog位置的间隔（秒）
-    log_interval = 300  # 5分钟记录一次
-    
-    # 创建数据库连接用于获取binlog位置
-    conn = pymysql.connect(
-        host=src_host,
-        port=src_port,
-        user=src_user,
-        password=src_password,
-        charset=src_charset
-    )
+    # 创建统一的事件处理器，开启批量模式时ES动作先写入缓冲区
+    bulk_writer = BulkWriter(es_client, bulk_max_actions, bulk_flush_interval, bulk_aggregate) if bulk_enabled else None
+    processor = EventProcessor(es_client, bulk_writer)
+    
+    # 开启多进程转换时，原始行交给进程池处理，由单个写入线程按顺序提交
+    pipeline = ProcessPipeline(processor.apply_actions, processor.flush, checkpoint_store.save,
+                               process_workers, process_batch_size) if process_enabled else None
+    if pipeline and (parallel_enabled or coalesce_enabled):
+        logger.warning("多进程转换模式下不使用行事件合并和并行写入")
     
+    # 开启并行时按目标文档分区，由多个线程并发写入ES
+    applier = ParallelApplier(processor.handle_event, parallel_workers, parallel_queue_size) \
+        if parallel_enabled and not pipeline else None
+    submit_event = applier.submit if applier else processor.handle_event
+    
+    # 写入失败的事件数，合并器的定时线程也会提交事件，计数需加锁
+    write_failures = 0
+    write_failures_lock = threading.Lock()
+    
+    def apply_event(action, data):
+        """提交事件并记录失败，失败后检查点不再前进"""
+        nonlocal write_failures
+        try:
+            ok = submit_event(action, data)
+        except Exception as e:
+            logger.error(f"写入事件时发生错误: {str(e)}, event: {data}")
+            ok = False
+        if not ok:
+            with write_failures_lock:
+                write_failures += 1
+        return ok
+    
+    # 开启合并时，窗口内同一行的多次变更只提交最新镜像
+    coalescer = EventCoalescer(apply_event, coalesce_window, coalesce_max_keys) \
+        if coalesce_enabled and not pipeline else None
+    handle_event = coalescer.add if coalescer else apply_event
+    
+    # 行数据转换器缓存
+    row_converters = RowConverterCache()
+    
+    def commit_checkpoint(log_file, log_pos, gtid_set):
+        """提交缓冲区后保存位点，保证位点不超前于已被ES确认的数据
+        
+        有事件写入失败时不保存位点，抛出WriteFailedError，从最近的检查点重新连接后重试。
+        """
+        nonlocal write_failures
+        if pipeline:
+            if pipeline.failed:
+                raise WriteFailedError(f"有 {pipeline.failed} 个事件写入失败")
+            # 由写入线程在之前的行全部写入且没有失败时保存
+            pipeline.checkpoint(log_file, log_pos, gtid_set)
+            return
+        if coalescer:
+            coalescer.flush()
+        if applier:
+            # 只保存各工作线程都已确认的位点，不等待仍在处理的事件
+            position = applier.checkpoint(log_file, log_pos, gtid_set, timeout=0)
+        else:
+            position = (log_file, log_pos, gtid_set)
+        failed = processor.flush() + (applier.failed if applier else 0)
+        with write_failures_lock:
+            failed, write_failures = failed + write_failures, 0
+        if failed:
+            raise WriteFailedError(f"有 {failed} 个事件写入失败")
+        if position:
+            checkpoint_store.save(*position)
+    
+    # 监控实例和监控线程在重新连接时复用
+    monitor = get_monitor()
+    monitor.set_source(settings)
+    
+    # 跟踪事务边界和已同步的GTID集合
+    tracker = TransactionTracker(gtid_set, checkpoint_interval)
+    event = None
+    
+    def process_event(binlog_event, log_file, log_pos):
+        """处理一个binlog事件，log_file/log_pos为读取该事件之后的位置"""
+        nonlocal event
+        observe_event(log_file, log_pos, binlog_event.timestamp)
+        monitor.record_event(binlog_event.timestamp, log_file, log_pos)
+        # 事务提交、空闲心跳和binlog切换后的位置可安全续传，按间隔保存检查点
+        if tracker.on_event(binlog_event):
+            commit_checkpoint(log_file, log_pos, tracker.gtid_set)
+        if not isinstance(binlog_event, ROW_EVENTS):
+            return
+        
+        if pipeline:
+            action, values_key = row_action(binlog_event)
+            EVENTS.labels(binlog_event.table, action).inc(len(binlog_event.rows))
+            rows = [row[values_key] for row in binlog_event.rows]
+            if version_enabled:
+                rows = [{**values, SEQ_FIELD: binlog_sequence(log_file, log_pos, binlog_event.event_size, row_index)}
+                        for row_index, values in enumerate(rows)]
+            if DELETED_ROWS.active:
+                for values in rows:
+                    DELETED_ROWS.observe(binlog_event.table, action, values)
+            pipeline.add(binlog_event.table, binlog_event.columns, action, rows)
+            return
+        
+        # 按表结构预编译的转换器，列类型只在表结构变化时重新判断
+        for action, event in row_events(binlog_event, row_converters.get(binlog_event), log_file, log_pos):
+            handle_event(
+                action=action,
+                data=event
+            )
+    
+    # 心跳超时视为连接挂起，读取线程收到标记后退出，从最近确认的检查点重新连接
+    reconnect_requested = threading.Event()
+    monitor.set_hung_handler(reconnect_requested.set)
+    
+    # 开启事件队列时，读取线程只负责读取binlog，转换和写入在写入线程中进行
+    event_queue = BoundedEventQueue(queue_max_rows, queue_max_bytes) if queue_enabled else None
+    if event_queue:
+        observe_queue(event_queue)
+    writer_errors = []
+    
+    def write_loop():
+        last_stats_time = time.time()
+        try:
+            while True:
+                item = event_queue.get()
+                if item is None:
+                    break
+                process_event(*item)
+                if time.time() - last_stats_time >= queue_stats_interval:
+                    stats = event_queue.stats()
+                    logger.info(
+                        f"事件队列: 深度={stats['rows']}行/{stats['bytes']}字节, "
+                        f"高水位={stats['high_water_rows']}行/{stats['high_water_bytes']}字节, "
+                        f"读取端阻塞{stats['blocked_count']}次共{stats['blocked_seconds']:.1f}秒"
+                    )
+                    last_stats_time = time.time()
+        except Exception as e:
+            writer_errors.append(e)
+            # 关闭队列使读取端停止
+            event_queue.close()
+    
+    failed = False
     try:
-        with processor:
-            for binlog_event in stream:
-                # 更新监控时间
-                monitor.update_event_time()
-                
-                current_time = time.time()
-                if current_time - last_log_time >= log_interval:
-                    current_log_file = stream.log_file
-                    current_log_pos = stream.log_pos
-                    
-                    logger.info(f"当前binlog位置: {current_log_file}:{current_log_pos}")
-                    update_binlog_config(current_log_file, current_log_pos)
-                    
-                    last_log_time = current_time
-                
-                for row in binlog_event.rows:
-                    event = {"schema": binlog_event.schema, "table": binlog_event.table}
-                    
-                    if isinstance(binlog_event, WriteRowsEvent):
-                        event["action"] = "insert"
-                        event.update(row["values"])
-                    elif isinstance(binlog_event, UpdateRowsEvent):
-                        event["action"] = "update"
-                        event.update(row["after_values"])
-                    elif isinstance(binlog_event, DeleteRowsEvent):
-                        event["action"] = "delete"
-                        event.update(row["values"])
+        with processor, pipeline or nullcontext(), applier or nullcontext(), coalescer or nullcontext():
+            writer = None
+            if event_queue:
+                writer = threading.Thread(target=write_loop, daemon=True, name="binlog-writer")
+                writer.start()
+            try:
+                for binlog_event in stream:
+                    if reconnect_requested.is_set():
+                        raise StreamHungError("binlog连接挂起")
+                    # 更新监控时间
+                    monitor.update_event_time()
+                    if isinstance(binlog_event, HeartbeatLogEvent):
+                        monitor.record_heartbeat()
                     
-                    json_data = json.loads(dict_to_json(event))
-                    processor.handle_event(
-                        action=event["action"],
-                        data=json_data
-                    )
+                    if event_queue is None:
+                        process_event(binlog_event, stream.log_file, stream.log_pos)
+                        continue
+                    # 行数据在读取线程中解析，按行数和事件字节数计入队列容量
+                    rows = len(binlog_event.rows) if hasattr(binlog_event, "rows") else 0
+                    if not event_queue.put((binlog_event, stream.log_file, stream.log_pos),
+                                           rows, binlog_event.event_size):
+                        break
+            finally:
+                if writer is not None:
+                    event_queue.close()
+                    writer.join()
+            if writer_errors:
+                raise writer_errors[0]
     except KeyboardInterrupt:
         logger.info("收到中断信号，程序退出")
     except Exception as e:
         logger.error(f"监听binlog过程中发生错误: {str(e)}, event: {event}")
+        failed = True
     finally:
+        monitor.set_hung_handler(None)
         stream.close()
         es_client.close()
-        conn.close()
         sys.stdout.flush()
+    return failed
+
+
+def start_async_binlog_listener(log_file, log_pos, gtid_set=None, settings=SRC_MYSQL_SETTINGS):
+    """以asyncio模式启动binlog监听
+    
+    binlog读取是阻塞的，在独立线程中读取并写入asyncio.Queue，
+    事件循环中的处理器通过AsyncElasticsearch并发发出请求。
+    
+    Args:
+        log_file: binlog文件名
+        log_pos: binlog位置
+        gtid_set: 已同步的GTID集合
+        settings: 源库连接配置
+        
+    Returns:
+        bool: 是否因错误中断，需要重新连接
+    """
+    logger.info(f"开始以asyncio模式监听binlog，源库: {settings['host']}:{settings['port']}，"
+                f"起始位置: {log_file}:{log_pos}，GTID集合: {gtid_set}")
+    try:
+        return asyncio.run(_run_async_listener(log_file, log_pos, gtid_set, settings))
+    except KeyboardInterrupt:
+        logger.info("收到中断信号，程序退出")
+        return False
+    finally:
+        sys.stdout.flush()
+
+
+def _read_binlog(stream, queue, loop, monitor, gtid_set, reconnect_requested):
+    """读取线程：把行事件和定时检查点写入队列，队列满时阻塞"""
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+    
+    row_converters = RowConverterCache()
+    tracker = TransactionTracker(gtid_set, checkpoint_interval)
+    event = None
+    try:
+        for binlog_event in stream:
+            if reconnect_requested.is_set():
+                raise StreamHungError("binlog连接挂起")
+            monitor.update_event_time()
+            if isinstance(binlog_event, HeartbeatLogEvent):
+                monitor.record_heartbeat()
+            observe_event(stream.log_file, stream.log_pos, binlog_event.timestamp)
+            monitor.record_event(binlog_event.timestamp, stream.log_file, stream.log_pos)
+            
+            if tracker.on_event(binlog_event):
+                put(("checkpoint", stream.log_file, stream.log_pos, tracker.gtid_set))
+            if not isinstance(binlog_event, ROW_EVENTS):
+                continue
+            
+            for action, event in row_events(binlog_event, row_converters.get(binlog_event),
+                                            stream.log_file, stream.log_pos):
+                put(("event", action, event))
+    except Exception as e:
+        logger.error(f"监听binlog过程中发生错误: {str(e)}, event: {event}")
+        put(("error",))
+    finally:
+        put(None)
+
+
+async def _run_async_listener(log_file, log_pos, gtid_set, settings):
+    stream = create_binlog_stream(log_file, log_pos, gtid_set, settings)
+    
+    # 存储脚本注册使用一次性的同步连接
+    sync_client = Elasticsearch(**ES_SETTINGS)
+    register_scripts(sync_client)
+    sync_client.close()
+    
+    from elasticsearch import AsyncElasticsearch
+    from async_processor import AsyncEventProcessor
+    es_client = AsyncElasticsearch(**ES_SETTINGS)
+    processor = AsyncEventProcessor(es_client, async_max_in_flight)
+    queue = asyncio.Queue(maxsize=async_queue_size)
+    
+    monitor = get_monitor()
+    monitor.set_source(settings)
+    
+    reconnect_requested = threading.Event()
+    monitor.set_hung_handler(reconnect_requested.set)
+    
+    reader = threading.Thread(target=_read_binlog,
+                              args=(stream, queue, asyncio.get_running_loop(), monitor, gtid_set,
+                                    reconnect_requested))
+    reader.daemon = True
+    reader.start()
+    
+    failed = False
+    write_failures = 0
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            if item[0] == "error":
+                failed = True
+            elif item[0] == "checkpoint":
+                # 已提交的请求全部完成且没有失败时再保存位点，失败时从最近的检查点重新连接
+                write_failures += await processor.drain()
+                if write_failures:
+                    logger.error(f"有 {write_failures} 个事件写入失败，不保存检查点")
+                    failed = True
+                    break
+                checkpoint_store.save(*item[1:])
+            elif not await processor.handle_event(action=item[1], data=item[2]):
+                write_failures += 1
+    finally:
+        await processor.drain()
+        await es_client.close()
+        monitor.set_hung_handler(None)
+        stream.close()
+    return failed
+
+
+def prepare_versioned_indices():
+    """开启版本号时补充宽表字段映射和过滤别名，设置独立索引的gc_deletes，清理早于检查点的墓碑"""
+    es_client = Elasticsearch(**ES_SETTINGS)
+    try:
+        ensure_version_mapping(es_client, index_name)
+        ensure_live_alias(es_client, index_name, version_live_alias)
+        ensure_gc_deletes(es_client, sorted({spec.target for spec in TABLE_SPECS.values() if spec.kind == "index"}),
+                          version_gc_deletes)
+        checkpoint = checkpoint_store.load()
+        if version_purge and checkpoint:
+            # 与嵌套元素删除记录的保留范围相同，重放起点不会早于检查点这么多
+            horizon = binlog_sequence(checkpoint["log_file"], checkpoint["log_pos"], 0, 0) - REMOVED_RETENTION
+            if horizon > 0:
+                purge_tombstones(es_client, index_name, horizon)
+    finally:
+        es_client.close()
 
 
 def main():
-    parser = argparse.ArgumentParser(description="工单数据同步工具")
-    args = parser.parse_args()
+    if metrics_enabled:
+        start_metrics_server(metrics_port)
+    if version_enabled and len(src_hosts) > 1:
+        logger.warning("binlog序号只在同一源库内递增，切换到文件序号较小的源库后写入会被拒绝，需重新初始化")
+    if version_enabled:
+        prepare_versioned_indices()
     
     init_time = None
     try:
@@ -246,7 +748,13 @@ def main():
     except (configparser.NoSectionError, configparser.NoOptionError):
         logger.info("配置文件中未找到初始化时间配置，将直接使用binlog位点")
     
-    if init_time:
+    if init_time and init_online:
+        position = start_online_init(init_time)
+        if position:
+            run_binlog_listener(*position)
+        else:
+            logger.error("无法获取在线初始化的binlog位置")
+    elif init_time:
         try:
             logger.info("尝试导入init_data模块...")
             import traceback
@@ -255,15 +763,16 @@ def main():
                 logger.info("成功导入init_data模块")
                 
                 logger.info(f"开始初始化历史数据，起始时间: {init_time}")
-                log_file, log_pos = init_data(init_time)
+                log_file, log_pos, gtid_set = init_data(init_time)
                 
                 if log_file and log_pos:
                     logger.info(f"初始化完成，使用最新binlog位置启动监听: {log_file}:{log_pos}")
                     update_binlog_config(log_file, log_pos)
-                    start_binlog_listener(log_file, log_pos)
+                    checkpoint_store.save(log_file, log_pos, gtid_set, force=True)
+                    run_binlog_listener(log_file, log_pos, gtid_set)
                 else:
                     logger.error("初始化数据后无法获取binlog位置，使用配置文件中的位置启动监听")
-                    start_binlog_listener(bin_log_file, bin_log_pos)
+                    run_binlog_listener(bin_log_file, bin_log_pos, bin_gtid_set)
             except ImportError as ie:
                 logger.error(f"导入init_data时出错: {str(ie)}")
                 logger.error(f"导入错误详情: {traceback.format_exc()}")
@@ -273,8 +782,14 @@ def main():
             logger.error(f"错误详情: {traceback.format_exc()}")
             return
     else:
-        logger.info(f"使用配置文件中的binlog位置启动监听: {bin_log_file}:{bin_log_pos}")
-        start_binlog_listener(bin_log_file, bin_log_pos)
+        checkpoint = checkpoint_store.load()
+        if checkpoint:
+            logger.info(f"使用检查点文件中的binlog位置启动监听: {checkpoint['log_file']}:{checkpoint['log_pos']}")
+            run_binlog_listener(checkpoint['log_file'], checkpoint['log_pos'],
+                                checkpoint.get('gtid_set') or bin_gtid_set)
+        else:
+            logger.info(f"使用配置文件中的binlog位置启动监听: {bin_log_file}:{bin_log_pos}")
+            run_binlog_listener(bin_log_file, bin_log_pos, bin_gtid_set)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: Prometheus监控指标
+
+from loguru import logger
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+import time
+
+# 同步的行事件数，按表和操作类型统计，rate()即每秒事件数
+EVENTS = Counter("orderes_events_total", "同步的行事件数", ["table", "action"])
+
+# 处理器处理单条行事件的耗时，批量模式下只包含写入缓冲区的时间
+HANDLER_SECONDS = Histogram(
+    "orderes_handler_seconds", "处理器处理单条行事件的耗时", ["table"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+# ES请求耗时和错误数，operation为index/update/delete/bulk
+ES_REQUEST_SECONDS = Histogram(
+    "orderes_es_request_seconds", "ES请求耗时", ["operation"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+ES_ERRORS = Counter("orderes_es_errors_total", "ES请求错误数", ["operation"])
+# ES端按retry_on_conflict重试后仍版本冲突的写入数
+ES_CONFLICTS = Counter("orderes_es_conflicts_total", "重试后仍版本冲突的写入数", ["index"])
+# 外部版本号不大于文档当前版本而被ES拒绝的写入数，即重放或乱序到达的旧数据
+STALE_WRITES = Counter("orderes_stale_writes_total", "版本号较旧被拒绝的写入数", ["index"])
+# 被ES永久拒绝或无法构造ES动作，记入死信日志后跳过的事件数
+DEAD_LETTERS = Counter("orderes_dead_letters_total", "记入死信日志后跳过的事件数", ["table"])
+
+# 每次_bulk请求包含的动作数
+BULK_ACTIONS = Histogram(
+    "orderes_bulk_actions", "每次批量请求包含的动作数",
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+)
+
+# 已处理到的binlog文件序号和位置
+BINLOG_FILE_INDEX = Gauge("orderes_binlog_file_index", "已处理到的binlog文件序号")
+BINLOG_POSITION = Gauge("orderes_binlog_position", "已处理到的binlog位置")
+
+# 复制延迟：处理事件时的当前时间减去binlog事件头中的时间戳
+REPLICATION_LAG = Gauge("orderes_replication_lag_seconds", "处理时间与binlog事件时间戳之差")
+LAST_EVENT_TIMESTAMP = Gauge("orderes_last_event_timestamp_seconds", "最近处理的binlog事件时间戳")
+
+# 已处理位置与主库当前位置的距离，以及按当前处理速度估算的追平时间（无法追平时为-1）
+BINLOG_DISTANCE_BYTES = Gauge("orderes_binlog_distance_bytes", "已处理位置与主库位置相差的字节数")
+BINLOG_DISTANCE_FILES = Gauge("orderes_binlog_distance_files", "已处理位置与主库位置相差的binlog文件数")
+CATCHUP_SECONDS = Gauge("orderes_catchup_seconds", "按当前处理速度估算的追平时间")
+
+# 事件队列指标在启用队列时注册
+_QUEUE_GAUGES = {}
+
+
+def observe_event(log_file: str, log_pos: int, timestamp: int):
+    """记录已处理的binlog位置和复制延迟"""
+    if log_file:
+        try:
+            BINLOG_FILE_INDEX.set(int(log_file.rsplit('.', 1)[-1]))
+        except ValueError:
+            pass
+    if log_pos:
+        BINLOG_POSITION.set(log_pos)
+    if timestamp:
+        LAST_EVENT_TIMESTAMP.set(timestamp)
+        REPLICATION_LAG.set(max(0.0, time.time() - timestamp))
+
+
+def observe_queue(event_queue):
+    """把事件队列的深度、高水位和阻塞时间注册为抓取时计算的指标"""
+    stats_gauges = (
+        ("rows", "事件队列中的行数"),
+        ("bytes", "事件队列中的字节数"),
+        ("high_water_rows", "事件队列行数高水位"),
+        ("high_water_bytes", "事件队列字节数高水位"),
+        ("blocked_seconds", "读取端因队列已满累计阻塞的秒数"),
+    )
+    for key, description in stats_gauges:
+        gauge = _QUEUE_GAUGES.get(key)
+        if gauge is None:
+            gauge = _QUEUE_GAUGES[key] = Gauge(f"orderes_queue_{key}", description)
+        gauge.set_function(lambda key=key: event_queue.stats()[key])
+
+
+def start_metrics_server(port: int) -> bool:
+    """启动指标HTTP服务"""
+    try:
+        start_http_server(port)
+        logger.info(f"监控指标服务已启动，端口: {port}")
+        return True
+    except Exception as e:
+        logger.error(f"启动监控指标服务失败: {str(e)}")
+        return False
@@ -10,6 +10,9 @@ import json
 from loguru import logger
 import configparser
 import os
+import pymysql
+
+from metrics import BINLOG_DISTANCE_BYTES, BINLOG_DISTANCE_FILES, CATCHUP_SECONDS, REPLICATION_LAG
 
 class BinlogMonitor:
     def __init__(self):
@@ -28,10 +31,33 @@ class BinlogMonitor:
         # 获取监控配置
         self.delay_threshold = int(config.get("monitor", "delay_threshold", fallback="300"))  # 默认5分钟
         self.check_interval = int(config.get("monitor", "check_interval", fallback="60"))  # 默认1分钟
+        # 与主库位置相差不超过该字节数视为已追上（binlog切换后新文件头部的事件不属于同步范围）
+        self.idle_bytes = int(config.get("monitor", "idle_bytes", fallback="4096"))
+        # 复制心跳间隔，开启后源库空闲时也会定期收到心跳，超过hung_timeout没有任何事件视为连接挂起
+        self.heartbeat = float(config.get("binlog", "heartbeat", fallback="0"))
+        self.hung_timeout = float(config.get("monitor", "hung_timeout", fallback=str(max(self.heartbeat * 3, 30))))
+        
+        # 查询主库binlog状态使用的连接配置，源库切换后由监听程序更新
+        self.source_settings = {
+            "host": config.get("source", "host"),
+            "port": int(config.get("source", "port")),
+            "user": config.get("source", "user"),
+            "passwd": config.get("source", "password"),
+            "charset": config.get("source", "charset"),
+        }
         
         
         # 记录上次binlog事件时间
         self.last_event_time = time.time()  
+        # 上次收到心跳的时间
+        self.last_heartbeat_time = None
+        # 连接挂起时的处理函数，由监听程序设置
+        self.hung_handler = None
+        # 最近处理的binlog事件时间戳和位置
+        self.last_event_timestamp = None
+        self.applied_position = None
+        # 上次检查时的(时间, 已处理位置, 主库位置)，用于计算处理速度和主库写入速度
+        self.last_check = None
     
     
     def send_wechat_alert(self, message):
@@ -61,16 +87,172 @@ class BinlogMonitor:
         """更新最后事件时间"""
         self.last_event_time = time.time()
     
+    def record_heartbeat(self):
+        """记录收到心跳，说明源库空闲但连接正常"""
+        self.last_heartbeat_time = time.time()
+    
+    def set_hung_handler(self, handler):
+        """设置连接挂起时调用的函数，None表示取消"""
+        self.hung_handler = handler
+    
+    def check_hung(self, current_time):
+        """开启心跳时，超过hung_timeout没有收到任何事件（包括心跳）视为连接挂起
+        
+        Returns:
+            bool: 连接是否挂起
+        """
+        if not self.heartbeat:
+            return False
+        silent = current_time - self.last_event_time
+        if silent <= self.hung_timeout:
+            return False
+        message = (
+            f"【Binlog连接挂起告警】\n已{int(silent)}秒未收到任何事件和心跳\n"
+            f"心跳间隔: {self.heartbeat:g}秒, 超时: {self.hung_timeout:g}秒\n"
+            f"已处理位置: {self.applied_position[0] + ':' + str(self.applied_position[1]) if self.applied_position else '未知'}\n"
+            f"将从最近的检查点重新连接"
+        )
+        self.send_wechat_alert(message)
+        logger.warning(message)
+        if self.hung_handler is not None:
+            self.hung_handler()
+        # 重新计时，等待重新连接
+        self.last_event_time = current_time
+        return True
+    
+    def is_idle(self, current_time):
+        """最近两个心跳间隔内收到过心跳，说明源库空闲且连接正常"""
+        return (self.heartbeat > 0 and self.last_heartbeat_time is not None
+                and current_time - self.last_heartbeat_time <= self.heartbeat * 2)
+    
+    def record_event(self, timestamp, log_file, log_pos):
+        """记录已处理事件的binlog时间戳和处理后的位置"""
+        if timestamp:
+            self.last_event_timestamp = timestamp
+        if log_file and log_pos:
+            self.applied_position = (log_file, log_pos)
+    
+    def set_source(self, settings):
+        """更新查询主库状态使用的源库"""
+        self.source_settings = settings
+    
+    def get_master_binlogs(self):
+        """查询主库当前位置和各binlog文件大小
+        
+        Returns:
+            tuple: ((log_file, log_pos), [(文件名, 文件大小), ...])，出错时返回(None, None)
+        """
+        conn = None
+        try:
+            conn = pymysql.connect(
+                host=self.source_settings["host"],
+                port=self.source_settings["port"],
+                user=self.source_settings["user"],
+                password=self.source_settings["passwd"],
+                charset=self.source_settings["charset"],
+                connect_timeout=5
+            )
+            with conn.cursor() as cursor:
+                cursor.execute("SHOW MASTER STATUS")
+                status = cursor.fetchone()
+                cursor.execute("SHOW BINARY LOGS")
+                binlogs = [(row[0], int(row[1])) for row in cursor.fetchall()]
+            if not status:
+                return None, None
+            return (status[0], int(status[1])), binlogs
+        except Exception as e:
+            logger.error(f"查询主库binlog状态时发生错误: {str(e)}")
+            return None, None
+        finally:
+            if conn is not None:
+                conn.close()
+    
+    @staticmethod
+    def binlog_distance(binlogs, start, end):
+        """计算两个binlog位置之间的字节数，起始文件已被清理时返回None"""
+        names = [name for name, _ in binlogs]
+        if start[0] not in names or end[0] not in names:
+            return None
+        i, j = names.index(start[0]), names.index(end[0])
+        if i == j:
+            return max(0, end[1] - start[1])
+        if i > j:
+            return 0
+        return (binlogs[i][1] - start[1]) + sum(size for _, size in binlogs[i + 1:j]) + end[1]
+    
     def check_delay(self):
-        """检查binlog延时"""
+        """检查binlog延时
+        
+        开启心跳时先判断连接是否挂起：有心跳说明源库空闲，没有任何事件才是连接挂起。
+        已处理位置追上主库时视为空闲，不告警；落后时按最近处理事件的时间戳计算延时，
+        并给出与主库相差的字节数、文件数以及按当前处理速度估算的追平时间。
+        """
         current_time = time.time()
-        delay = current_time - self.last_event_time
+        if self.check_hung(current_time):
+            return
+        master_position, binlogs = self.get_master_binlogs()
+        applied_position = self.applied_position
+        if master_position is None or applied_position is None or self.last_event_timestamp is None:
+            if self.is_idle(current_time):
+                # 只收到心跳，源库空闲
+                REPLICATION_LAG.set(0)
+                return
+            # 无法获取位置时退回为按接收间隔判断
+            delay = current_time - self.last_event_time
+            if delay > self.delay_threshold:
+                message = f"【Binlog延时告警】\n当前binlog接收延时: {int(delay)}秒\n超过阈值: {self.delay_threshold}秒"
+                self.send_wechat_alert(message)
+                logger.warning(message)
+            return
         
-        if delay > self.delay_threshold:
-            message = f"【Binlog延时告警】\n当前binlog接收延时: {int(delay)}秒\n超过阈值: {self.delay_threshold}秒"
+        distance = self.binlog_distance(binlogs, applied_position, master_position)
+        file_distance = self._file_index(master_position[0]) - self._file_index(applied_position[0])
+        BINLOG_DISTANCE_FILES.set(file_distance)
+        if distance is not None:
+            BINLOG_DISTANCE_BYTES.set(distance)
+        
+        # 估算追平时间：净追赶速度为处理速度减去主库写入速度
+        eta = None
+        if self.last_check is not None and distance is not None:
+            last_time, last_applied, last_master = self.last_check
+            elapsed = current_time - last_time
+            applied_bytes = self.binlog_distance(binlogs, last_applied, applied_position)
+            written_bytes = self.binlog_distance(binlogs, last_master, master_position)
+            if elapsed > 0 and applied_bytes is not None and written_bytes is not None:
+                catchup_rate = (applied_bytes - written_bytes) / elapsed
+                if catchup_rate > 0:
+                    eta = distance / catchup_rate
+        self.last_check = (current_time, applied_position, master_position)
+        
+        if distance is not None and distance <= self.idle_bytes:
+            # 已追上主库，源库空闲时不视为延时
+            REPLICATION_LAG.set(0)
+            CATCHUP_SECONDS.set(0)
+            return
+        CATCHUP_SECONDS.set(eta if eta is not None else -1)
+        
+        lag = current_time - self.last_event_timestamp
+        stalled = current_time - self.last_event_time
+        if lag > self.delay_threshold:
+            message = (
+                f"【Binlog延时告警】\n当前同步延时: {int(lag)}秒\n超过阈值: {self.delay_threshold}秒\n"
+                f"已处理位置: {applied_position[0]}:{applied_position[1]}\n"
+                f"主库位置: {master_position[0]}:{master_position[1]}\n"
+                f"相差: {distance if distance is not None else '未知'}字节, {file_distance}个文件\n"
+                f"预计追平: {f'{int(eta)}秒' if eta is not None else '无法估算（处理速度不高于写入速度）'}\n"
+                f"距上次接收事件: {int(stalled)}秒"
+            )
             self.send_wechat_alert(message)
             logger.warning(message)
     
+    @staticmethod
+    def _file_index(log_file):
+        """binlog文件名中的序号"""
+        try:
+            return int(log_file.rsplit('.', 1)[-1])
+        except ValueError:
+            return 0
+    
     def start_monitoring(self):
         """启动监控"""
         logger.info("启动binlog延时监控")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 按目标文档分区的并行写入线程池
+
+from collections import deque
+from loguru import logger
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import queue
+import threading
+import time
+import zlib
+
+from handlers import TABLE_SPECS
+
+
+def partition_key(data: Dict) -> str:
+    """事件对应的目标文档ID，工单子表为WorkOrderId，独立索引的表为自身Id"""
+    spec = TABLE_SPECS.get(data.get('table'))
+    if spec is None:
+        return ''
+    return spec.doc_id(data)
+
+
+class ParallelApplier:
+    """把行事件按目标文档ID哈希到固定的工作线程
+
+    同一文档的事件始终由同一线程按到达顺序处理，不同工单并发写入ES。
+    每个事件分配递增序号，线程处理完成即确认；位点只有在其之前的
+    全部事件都已被各线程确认后才会作为可提交位点返回。
+    处理失败的事件不确认，可提交位点停在该事件之前。
+    """
+    def __init__(self, handle_event: Callable[[str, Dict], bool], workers: int = 4, queue_size: int = 1000):
+        self.handle_event = handle_event
+        self.workers = max(1, workers)
+        self._queues: List[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in range(self.workers)]
+        # 各线程最后分配和最后确认的事件序号
+        self._queued_seq = [0] * self.workers
+        self._done_seq = [0] * self.workers
+        self._seq = 0
+        # (事件序号, (binlog文件, binlog位置, GTID集合))，序号之前的事件全部确认后该位置可提交
+        self._marks: Deque[Tuple[int, Tuple]] = deque()
+        self._acked_position: Optional[Tuple] = None
+        # 处理失败的事件数和最早失败的事件序号
+        self.failed = 0
+        self._failed_seq: Optional[int] = None
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._acked = threading.Condition(self._lock)
+        self._threads: List[threading.Thread] = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """启动工作线程"""
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work_loop, args=(index,), daemon=True,
+                                      name=f"apply-worker-{index}")
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self):
+        """处理完队列中剩余的事件后停止工作线程"""
+        for worker_queue in self._queues:
+            worker_queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, action: str, data: Dict) -> bool:
+        """按目标文档分派事件，线程队列已满时阻塞等待"""
+        index = zlib.crc32(partition_key(data).encode('utf-8')) % self.workers
+        # 分配序号和入队在同一把锁内完成，保证同一线程内序号递增；
+        # 入队可能阻塞，使用单独的锁，避免阻塞工作线程确认
+        with self._submit_lock:
+            with self._lock:
+                self._seq += 1
+                seq = self._seq
+                self._queued_seq[index] = seq
+            self._queues[index].put((seq, action, data))
+        return True
+
+    def mark(self, log_file: str, log_pos: int, gtid_set: Optional[str] = None):
+        """记录当前binlog位置，已提交的事件全部确认后该位置才可作为检查点"""
+        with self._lock:
+            self._marks.append((self._seq, (log_file, log_pos, gtid_set)))
+
+    def acked_position(self) -> Optional[Tuple]:
+        """返回之前事件已全部确认的最新(binlog文件, binlog位置, GTID集合)，没有时返回None"""
+        with self._lock:
+            watermark = self._watermark()
+            while self._marks and self._marks[0][0] <= watermark:
+                _, self._acked_position = self._marks.popleft()
+            return self._acked_position
+
+    def checkpoint(self, log_file: str, log_pos: int, gtid_set: Optional[str] = None,
+                   timeout: float = 5.0) -> Optional[Tuple]:
+        """记录位置并在超时时间内等待其之前的事件确认
+
+        Returns:
+            tuple: 可提交的(binlog文件, binlog位置, GTID集合)，超时则返回更早的已确认位置
+        """
+        self.mark(log_file, log_pos, gtid_set)
+        deadline = time.time() + timeout
+        with self._acked:
+            seq = self._seq
+            while self._watermark() < seq:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._acked.wait(remaining)
+        return self.acked_position()
+
+    def _watermark(self) -> int:
+        """所有线程都已确认的最大序号，调用方需持有锁
+
+        线程内按序号顺序处理，空闲线程不限制水位，
+        忙碌线程确认到的序号之前的事件都已处理完毕。有事件失败时水位不超过该事件之前。
+        """
+        busy = [done for done, queued in zip(self._done_seq, self._queued_seq) if done < queued]
+        watermark = min(busy) if busy else self._seq
+        if self._failed_seq is not None:
+            watermark = min(watermark, self._failed_seq - 1)
+        return watermark
+
+    def _work_loop(self, index: int):
+        worker_queue = self._queues[index]
+        while True:
+            item = worker_queue.get()
+            if item is None:
+                break
+            seq, action, data = item
+            try:
+                ok = self.handle_event(action, data)
+            except Exception as e:
+                logger.error(f"并行写入事件时发生错误: {str(e)}, event: {data}")
+                ok = False
+            with self._acked:
+                if not ok:
+                    self.failed += 1
+                    if self._failed_seq is None or seq < self._failed_seq:
+                        self._failed_seq = seq
+                self._done_seq[index] = seq
+                self._acked.notify_all()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 多进程行数据转换和ES动作构造
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from loguru import logger
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import multiprocessing
+import threading
+import time
+
+from row_converter import RowConverter, column_signature
+
+# 工作进程内按(表名, 表结构签名)缓存的转换器和按表名缓存的处理器
+_worker_converters: Dict[Tuple, RowConverter] = {}
+_worker_handlers: Dict = {}
+
+
+def _build_batch(batch: List[Tuple[str, tuple, str, List[Dict]]]) -> List[Tuple[str, Dict, Optional[List[Dict]]]]:
+    """工作进程：把一批原始行转换为行数据并构造ES动作
+
+    Args:
+        batch: (表名, 表结构签名, 操作类型, 原始行镜像列表)组成的列表
+
+    Returns:
+        list: 按输入顺序排列的(操作类型, 行数据, ES动作列表)
+    """
+    if not _worker_handlers:
+        from handlers import TableHandler, TABLE_SPECS
+        _worker_handlers.update({table: TableHandler(None, spec) for table, spec in TABLE_SPECS.items()})
+
+    results = []
+    for table, signature, action, rows in batch:
+        converter = _worker_converters.get((table, signature))
+        if converter is None:
+            converter = RowConverter.from_signature(table, signature)
+            _worker_converters[(table, signature)] = converter
+        handler = _worker_handlers.get(converter.table)
+        for values in rows:
+            try:
+                data = converter.convert(values)
+                actions = handler.build_actions(action, data) if handler is not None else None
+            except Exception as e:
+                # 转换结果只由行数据决定，不让一行拖垮整个批次；动作为None时由写入线程记入死信日志
+                logger.error(f"进程池转换行数据时发生错误: 表={table}, {str(e)}")
+                data, actions = {"table": table, **{str(key): value for key, value in values.items()}}, None
+            results.append((action, data, actions))
+    return results
+
+
+class ProcessPipeline:
+    """读取线程把原始行按批次交给进程池转换，单个写入线程按提交顺序取回结果并写入
+
+    行数据转换和ES动作构造分摊到多个进程，写入顺序与binlog顺序一致。
+    检查点作为批次之间的标记按顺序处理，之前的结果全部写入并提交缓冲区后才记录位点。
+    有行转换或写入失败后不再记录位点，由调用方根据failed从最近的检查点重新同步。
+    未达到批次大小的行在flush_interval后也会提交，保证低流量时及时写入。
+    """
+    def __init__(self, apply_actions: Callable[[str, Dict, Optional[List[Dict]]], bool],
+                 flush: Callable[[], int], on_checkpoint: Callable[[str, int, Optional[str]], bool],
+                 workers: int = 2, batch_size: int = 500, flush_interval: float = 0.2, max_pending: int = 8):
+        self.apply_actions = apply_actions
+        self.flush = flush
+        self.on_checkpoint = on_checkpoint
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._executor = None
+        self._batch: List[Tuple[str, tuple, str, List[Dict]]] = []
+        self._batch_rows = 0
+        self._first_add_time = None
+        # _lock保护当前批次，批次按加入顺序提交
+        self._lock = threading.Lock()
+        # 按提交顺序排列的批次结果和检查点标记
+        self._pending: Deque = deque()
+        self._slots = threading.Semaphore(max(1, max_pending))
+        self._ready = threading.Condition()
+        self._closed = False
+        self._stop_event = threading.Event()
+        self._writer_thread = None
+        self._flush_thread = None
+        # 转换或写入失败的次数，写入线程更新
+        self.failed = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """创建进程池并启动写入线程"""
+        if self._executor is None:
+            # 读取端已有多个线程在运行，使用spawn避免fork继承线程持有的锁
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            self._writer_thread = threading.Thread(target=self._write_loop, daemon=True, name="process-writer")
+            self._writer_thread.start()
+            self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flush_thread.start()
+
+    def close(self):
+        """提交剩余批次，等待写入线程处理完毕后关闭进程池"""
+        if self._executor is None:
+            return
+        self._stop_event.set()
+        self._flush_thread.join()
+        with self._lock:
+            self._submit_batch()
+        with self._ready:
+            self._closed = True
+            self._ready.notify()
+        self._writer_thread.join()
+        self._executor.shutdown()
+        self._executor = None
+
+    def add(self, table: str, columns, action: str, rows: List[Dict]):
+        """加入一个binlog行事件的原始行镜像，达到批次大小时提交给进程池"""
+        signature = column_signature(columns)
+        with self._lock:
+            if not self._batch:
+                self._first_add_time = time.time()
+            self._batch.append((table, signature, action, rows))
+            self._batch_rows += len(rows)
+            if self._batch_rows >= self.batch_size:
+                self._submit_batch()
+
+    def checkpoint(self, log_file: str, log_pos: int, gtid_set: Optional[str] = None):
+        """在当前位置插入检查点，之前的行全部写入后由写入线程记录位点"""
+        with self._lock:
+            self._submit_batch()
+            self._enqueue(("checkpoint", log_file, log_pos, gtid_set))
+
+    def _submit_batch(self):
+        """提交当前批次，调用方需持有_lock"""
+        if not self._batch:
+            return
+        batch, self._batch, self._batch_rows = self._batch, [], 0
+        self._first_add_time = None
+        # 待处理批次达到上限时阻塞读取端
+        self._slots.acquire()
+        self._enqueue(self._executor.submit(_build_batch, batch))
+
+    def _enqueue(self, item):
+        with self._ready:
+            self._pending.append(item)
+            self._ready.notify()
+
+    def _flush_loop(self):
+        """按时间阈值提交未满的批次"""
+        while not self._stop_event.wait(self.flush_interval / 2):
+            with self._lock:
+                if self._first_add_time is not None and time.time() - self._first_add_time >= self.flush_interval:
+                    self._submit_batch()
+
+    def _write_loop(self):
+        while True:
+            with self._ready:
+                while not self._pending and not self._closed:
+                    self._ready.wait()
+                if not self._pending:
+                    return
+                item = self._pending.popleft()
+
+            if isinstance(item, Future):
+                try:
+                    results = item.result()
+                except Exception as e:
+                    logger.error(f"进程池转换行数据时发生错误: {str(e)}")
+                    results = []
+                    self.failed += 1
+                finally:
+                    self._slots.release()
+                for action, data, actions in results:
+                    try:
+                        ok = self.apply_actions(action, data, actions)
+                    except Exception as e:
+                        logger.error(f"写入事件时发生错误: {str(e)}, event: {data}")
+                        ok = False
+                    if not ok:
+                        self.failed += 1
+            else:
+                _, log_file, log_pos, gtid_set = item
+                self.failed += self.flush()
+                if self.failed:
+                    logger.error(f"有 {self.failed} 个事件写入失败，不保存检查点: {log_file}:{log_pos}")
+                    continue
+                self.on_checkpoint(log_file, log_pos, gtid_set)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: GTID集合维护和源库故障切换选择
+
+from loguru import logger
+from pymysqlreplication.event import GtidEvent, HeartbeatLogEvent, RotateEvent, XidEvent
+from typing import Dict, List, Optional, Tuple
+import bisect
+import pymysql
+import time
+
+
+class ExecutedGtidSet:
+    """已同步事务的GTID集合
+
+    每个事务提交时加入一个GTID，按源库UUID维护已排序的闭区间列表。
+    连续的事务只需延长最后一个区间，避免每个事务都复制整个集合。
+    """
+    def __init__(self, gtid_set: str = ""):
+        self._intervals: Dict[str, List[List[int]]] = {}
+        for part in (gtid_set or "").replace("\n", "").split(","):
+            part = part.strip()
+            if not part:
+                continue
+            sid, *ranges = part.split(":")
+            for value in ranges:
+                start, _, end = value.partition("-")
+                self._add_range(sid.lower(), int(start), int(end or start))
+
+    def add(self, gtid: str):
+        """加入单个GTID，格式为uuid:序号，已包含时忽略"""
+        sid, _, gno = gtid.rpartition(":")
+        self._add_range(sid.lower(), int(gno), int(gno))
+
+    def _add_range(self, sid: str, start: int, end: int):
+        intervals = self._intervals.setdefault(sid, [])
+        if intervals and intervals[-1][0] <= start and intervals[-1][1] + 1 >= start:
+            # 顺序提交的常见情况：延长最后一个区间
+            intervals[-1][1] = max(intervals[-1][1], end)
+            return
+        position = bisect.bisect_left(intervals, [start, end])
+        intervals.insert(position, [start, end])
+        # 合并与相邻区间重叠或相接的部分
+        merged: List[List[int]] = []
+        for interval in intervals:
+            if merged and interval[0] <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], interval[1])
+            else:
+                merged.append(interval)
+        self._intervals[sid] = merged
+
+    def __bool__(self):
+        return bool(self._intervals)
+
+    def __str__(self):
+        parts = []
+        for sid, intervals in sorted(self._intervals.items()):
+            ranges = [f"{start}-{end}" if start != end else f"{start}" for start, end in intervals]
+            parts.append(":".join([sid] + ranges))
+        return ",".join(parts)
+
+
+class TransactionTracker:
+    """跟踪事务边界和已同步的GTID集合，判断读取某个事件后的位置能否作为检查点
+
+    事务提交(Xid)、心跳和binlog切换时没有未完成的行事件，位置可以安全续传；
+    没有Xid的事务（如DDL）在下一个事务开始或空闲心跳到达时计入GTID集合。
+    """
+    def __init__(self, gtid_set: Optional[str] = None, interval: float = 1.0):
+        # 空字符串表示源库开启了GTID但尚无已执行的事务，同样需要跟踪
+        self.executed_gtids = ExecutedGtidSet(gtid_set) if gtid_set is not None else None
+        self.interval = interval
+        self._pending_gtid = None
+        self._rows_pending = False
+        self._last_checkpoint_time = time.time()
+
+    @property
+    def gtid_set(self) -> Optional[str]:
+        """已同步的GTID集合，未提供初始集合时为None"""
+        return str(self.executed_gtids) if self.executed_gtids else None
+
+    def on_event(self, binlog_event) -> bool:
+        """处理一个事件
+
+        Returns:
+            bool: 该事件之后的位置可作为检查点且已到保存间隔
+        """
+        if isinstance(binlog_event, GtidEvent):
+            self._commit_pending_gtid()
+            self._pending_gtid = binlog_event.gtid
+            return False
+        if isinstance(binlog_event, XidEvent):
+            self._commit_pending_gtid()
+            self._rows_pending = False
+            return self._is_due()
+        if isinstance(binlog_event, (HeartbeatLogEvent, RotateEvent)):
+            if self._rows_pending:
+                return False
+            self._commit_pending_gtid()
+            return self._is_due()
+        # 行事件，所属事务提交前位置不可续传
+        self._rows_pending = True
+        return False
+
+    def _commit_pending_gtid(self):
+        if self._pending_gtid and self.executed_gtids is not None:
+            self.executed_gtids.add(self._pending_gtid)
+        self._pending_gtid = None
+
+    def _is_due(self) -> bool:
+        now = time.time()
+        if now - self._last_checkpoint_time < self.interval:
+            return False
+        self._last_checkpoint_time = now
+        return True
+
+
+# binlog序号中单个文件内位置所占的位数，文件序号在其上
+SEQUENCE_POSITION_BITS = 36
+
+
+def binlog_sequence(log_file: str, log_pos: int, event_size: int, row_index: int) -> int:
+    """由binlog坐标生成单调递增的行序号，用作ES外部版本号
+
+    事件内第row_index行的序号为事件起始位置加row_index，事件内的行数小于事件字节数，
+    不会与下一个事件重叠。只在同一源库的binlog文件序列内递增。
+
+    Args:
+        log_file: binlog文件名
+        log_pos: 读取该事件之后的位置，即事件结束位置
+        event_size: 事件字节数
+        row_index: 行在事件中的序号
+    """
+    file_index = int(log_file.rsplit('.', 1)[-1])
+    return (file_index << SEQUENCE_POSITION_BITS) + log_pos - event_size + row_index
+
+
+def gtid_set_at(settings: Dict, log_file: str, log_pos: int) -> Optional[str]:
+    """计算源库截至log_file:log_pos已执行的GTID集合
+
+    以binlog文件开头Previous_gtids事件中的集合为基础，加上该文件中log_pos之前提交的GTID。
+
+    Returns:
+        str: GTID集合，可能为空字符串；源库未开启GTID时返回None
+    """
+    conn = pymysql.connect(
+        host=settings["host"],
+        port=settings["port"],
+        user=settings["user"],
+        password=settings["passwd"],
+        charset=settings["charset"],
+        connect_timeout=5
+    )
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT @@GLOBAL.gtid_mode")
+            if cursor.fetchone()[0] != "ON":
+                return None
+        executed = ExecutedGtidSet()
+        # binlog文件可能很大，流式读取事件列表
+        with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute("SHOW BINLOG EVENTS IN %s", (log_file,))
+            for _, pos, event_type, _, end_log_pos, info in cursor:
+                if pos >= log_pos:
+                    break
+                if event_type == "Previous_gtids":
+                    executed = ExecutedGtidSet(info)
+                elif event_type == "Gtid" and end_log_pos <= log_pos:
+                    # Info形如 SET @@SESSION.GTID_NEXT= 'uuid:序号'
+                    executed.add(info.split("'")[1])
+        return str(executed)
+    finally:
+        conn.close()
+
+
+def parse_hosts(hosts: str, default_port: int) -> List[Tuple[str, int]]:
+    """解析逗号分隔的host[:port]列表，顺序即切换优先级"""
+    result = []
+    for item in hosts.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(':')
+        result.append((host, int(port) if port else default_port))
+    return result
+
+
+def host_has_gtid_set(settings: Dict, gtid_set: str) -> bool:
+    """源库已执行我们的全部事务，且所需的binlog未被清理"""
+    conn = None
+    try:
+        conn = pymysql.connect(
+            host=settings["host"],
+            port=settings["port"],
+            user=settings["user"],
+            password=settings["passwd"],
+            charset=settings["charset"],
+            connect_timeout=5
+        )
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT GTID_SUBSET(%s, @@GLOBAL.gtid_executed), GTID_SUBSET(@@GLOBAL.gtid_purged, %s)",
+                (gtid_set, gtid_set)
+            )
+            has_executed, has_binlogs = cursor.fetchone()
+        if not has_executed:
+            logger.warning(f"源库 {settings['host']}:{settings['port']} 缺少已同步的事务，跳过")
+        elif not has_binlogs:
+            logger.warning(f"源库 {settings['host']}:{settings['port']} 已清理所需的binlog，跳过")
+        return bool(has_executed and has_binlogs)
+    except Exception as e:
+        logger.error(f"检查源库 {settings['host']}:{settings['port']} 时发生错误: {str(e)}")
+        return False
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def select_source(hosts: List[Tuple[str, int]], base_settings: Dict, gtid_set: Optional[str]) -> Optional[Dict]:
+    """按顺序选择可以从gtid_set继续同步的源库
+
+    没有GTID集合时binlog文件位点只在原源库上有效，固定使用第一个源库。
+
+    Returns:
+        dict: 源库连接配置，没有可用源库时返回None
+    """
+    if not gtid_set:
+        host, port = hosts[0]
+        return {**base_settings, "host": host, "port": port}
+    for host, port in hosts:
+        settings = {**base_settings, "host": host, "port": port}
+        if host_has_gtid_set(settings, gtid_set):
+            return settings
+    return None
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 按binlog表结构预编译的行数据转换器
+
+import datetime
+import decimal
+import json
+from typing import Any, Callable, Dict, NamedTuple
+
+from pymysqlreplication.constants import FIELD_TYPE
+
+from utils import dict_to_str, normalize_row
+
+DATETIME_TYPES = {FIELD_TYPE.DATETIME, FIELD_TYPE.DATETIME2, FIELD_TYPE.TIMESTAMP, FIELD_TYPE.TIMESTAMP2}
+DECIMAL_TYPES = {FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL}
+INT_TYPES = {FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.LONGLONG, FIELD_TYPE.INT24, FIELD_TYPE.YEAR}
+STRING_TYPES = {FIELD_TYPE.VARCHAR, FIELD_TYPE.VAR_STRING, FIELD_TYPE.STRING}
+BLOB_TYPES = {FIELD_TYPE.BLOB, FIELD_TYPE.TINY_BLOB, FIELD_TYPE.MEDIUM_BLOB, FIELD_TYPE.LONG_BLOB}
+
+
+# 各转换函数只处理该列类型的常见取值，其余情况回退到dict_to_str，结果与normalize_row一致
+def _convert_int(value: Any) -> Any:
+    return value if type(value) is int else dict_to_str(value)
+
+
+def _convert_datetime(value: Any) -> Any:
+    if type(value) is datetime.datetime:
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return dict_to_str(value)
+
+
+def _convert_decimal(value: Any) -> Any:
+    return str(value) if type(value) is decimal.Decimal else dict_to_str(value)
+
+
+def _convert_str(value: Any) -> Any:
+    if type(value) is str:
+        stripped = value.strip("'")
+        # 只有形如JSON的字符串才需要尝试解析
+        if stripped[:1] not in ('{', '['):
+            return stripped
+    return dict_to_str(value)
+
+
+def _convert_bytes(value: Any) -> Any:
+    if type(value) is bytes:
+        try:
+            return value.decode('utf-8')
+        except UnicodeDecodeError:
+            return value.hex()
+    return dict_to_str(value)
+
+
+def _convert_json_column(value: Any) -> Any:
+    """名称以json结尾的列优先整体按JSON解析，与normalize_row的规则相同"""
+    if type(value) is str:
+        try:
+            return json.loads(value.strip("'").replace("'", '"'))
+        except json.JSONDecodeError:
+            pass
+    return dict_to_str(value)
+
+
+def _converter_for(name: str, column_type: int) -> Callable[[Any], Any]:
+    """根据列名和列类型选择转换函数"""
+    if name.lower().endswith('json') and name != 'BussinessJson':
+        return _convert_json_column
+    if column_type in INT_TYPES:
+        return _convert_int
+    if column_type in DATETIME_TYPES:
+        return _convert_datetime
+    if column_type in DECIMAL_TYPES:
+        return _convert_decimal
+    if column_type in STRING_TYPES:
+        return _convert_str
+    if column_type in BLOB_TYPES:
+        return _convert_bytes
+    return dict_to_str
+
+
+def column_signature(columns) -> tuple:
+    """列名和列类型组成的表结构签名"""
+    return tuple((column.name, column.type) for column in columns)
+
+
+class SignatureColumn(NamedTuple):
+    """由表结构签名还原的列定义，用于在其他进程中重建转换器"""
+    name: str
+    type: int
+
+
+class RowConverter:
+    """单张表的行数据转换器，列的转换函数在创建时一次确定"""
+    def __init__(self, table: str, columns):
+        self.columns = columns
+        self.signature = column_signature(columns)
+        self.table = dict_to_str(table)
+        self.converters = {
+            column.name: _converter_for(column.name, column.type)
+            for column in columns
+            if isinstance(column.name, str)
+        }
+        # normalize_row会丢弃名为schema/action的键，极少出现，只在存在时处理
+        self.reserved = [name for name in ('schema', 'action') if name in self.converters]
+
+    @classmethod
+    def from_signature(cls, table: str, signature: tuple) -> 'RowConverter':
+        """按表结构签名创建转换器"""
+        return cls(table, [SignatureColumn(name, column_type) for name, column_type in signature])
+
+    def convert(self, values: Dict) -> Dict:
+        """转换一行数据，结果与normalize_row({"table": 表名, **values})一致"""
+        record = {'table': self.table}
+        converters = self.converters
+        for name, value in values.items():
+            if value is None:
+                record[name] = None
+                continue
+            func = converters.get(name)
+            if func is None:
+                record.update(normalize_row({name: value}))
+            else:
+                record[name] = func(value)
+        for name in self.reserved:
+            record.pop(name, None)
+        return record
+
+
+class RowConverterCache:
+    """按table_id缓存行数据转换器
+
+    每个事务的TableMapEvent都会生成新的列列表，列列表对象未变时直接复用，
+    变化时再比较列名和列类型，表结构确有变更才重新编译。
+    """
+    def __init__(self):
+        self._cache: Dict[int, RowConverter] = {}
+
+    def get(self, binlog_event) -> RowConverter:
+        converter = self._cache.get(binlog_event.table_id)
+        columns = binlog_event.columns
+        if converter is not None and converter.columns is columns:
+            return converter
+        if converter is None or converter.signature != column_signature(columns):
+            converter = RowConverter(binlog_event.table, columns)
+            self._cache[binlog_event.table_id] = converter
+        else:
+            converter.columns = columns
+        return converter
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 嵌套数组维护使用的ES存储脚本
+
+from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import NotFoundError
+from loguru import logger
+import hashlib
+
+# 文档中记录binlog序号的字段，下面的脚本使用相同的字段名
+SEQ_FIELD = "BinlogSeq"
+# 工单删除后保留的墓碑文档标记，墓碑的BinlogSeq为删除的序号，序号不大于它的写入都被跳过
+DELETED_FIELD = "BinlogDeleted"
+# 嵌套元素删除后在文档中记录的{数组字段名: {主键值: 删除序号}}，序号不大于它的同一元素更新都被跳过
+REMOVED_FIELD = "BinlogRemoved"
+# 删除记录的保留范围：比同一数组最新删除早4个binlog文件(4 << 36)以上的记录在下次删除时清理，
+# 重放起点即检查点不会落后这么远，更早的写入不会再到达
+REMOVED_RETENTION = 4 << 36
+
+# 嵌套数组按主键更新或追加元素，params: field数组字段名, key主键字段名, item元素
+# 元素带有BinlogSeq时，已有元素、墓碑文档或该元素的删除记录的序号不小于它则不更新
+NESTED_UPSERT_SOURCE = """
+    def seq = params.item.BinlogSeq;
+    def removed = ctx._source.BinlogRemoved == null ? null : ctx._source.BinlogRemoved[params.field];
+    def removedKey = String.valueOf(params.item[params.key]);
+    def removedSeq = removed == null ? null : removed[removedKey];
+    if (seq != null && ((ctx._source.BinlogDeleted == true && ctx._source.BinlogSeq >= seq)
+            || (removedSeq != null && removedSeq >= seq))) {
+        ctx.op = 'none';
+    } else {
+        if (removedSeq != null) {
+            removed.remove(removedKey);
+        }
+        if (ctx._source[params.field] == null) {
+            ctx._source[params.field] = new ArrayList();
+        }
+        def items = ctx._source[params.field];
+        def found = false;
+        for (int i=0; i<items.size(); i++) {
+            if (items[i][params.key] == params.item[params.key]) {
+                if (seq != null && items[i].BinlogSeq != null && items[i].BinlogSeq >= seq) {
+                    ctx.op = 'none';
+                } else {
+                    items.set(i, params.item);
+                }
+                found = true;
+                break;
+            }
+        }
+        if (!found) {
+            items.add(params.item);
+        }
+    }
+"""
+
+# 嵌套数组按主键删除元素，params: field数组字段名, key主键字段名, value主键值, seq序号(可省略)
+# 带seq时序号不小于它的元素是删除之后写入的，不删除；删除序号记入BinlogRemoved，挡住乱序到达的旧更新
+NESTED_REMOVE_SOURCE = """
+    if (params.seq != null) {
+        if (ctx._source.BinlogRemoved == null) {
+            ctx._source.BinlogRemoved = new HashMap();
+        }
+        if (ctx._source.BinlogRemoved[params.field] == null) {
+            ctx._source.BinlogRemoved[params.field] = new HashMap();
+        }
+        def removed = ctx._source.BinlogRemoved[params.field];
+        def removedKey = String.valueOf(params.value);
+        if (removed[removedKey] == null || removed[removedKey] < params.seq) {
+            removed[removedKey] = params.seq;
+        }
+        long horizon = params.seq - REMOVED_RETENTIONL;
+        removed.values().removeIf(s -> s < horizon);
+    }
+    if (ctx._source[params.field] != null) {
+        def iterator = ctx._source[params.field].iterator();
+        while (iterator.hasNext()) {
+            def item = iterator.next();
+            if (item[params.key] == params.value
+                    && (params.seq == null || item.BinlogSeq == null || item.BinlogSeq < params.seq)) {
+                iterator.remove();
+            }
+        }
+    }
+""".replace("REMOVED_RETENTION", str(REMOVED_RETENTION))
+
+# 按序号更新宽表顶层字段，序号不大于文档已记录的序号时不更新，params: doc顶层字段, seq序号
+# 删除之后重新插入的工单序号更大，覆盖墓碑
+DOC_UPSERT_SOURCE = """
+    if (ctx._source.BinlogSeq != null && ctx._source.BinlogSeq >= params.seq) {
+        ctx.op = 'none';
+    } else {
+        ctx._source.remove('BinlogDeleted');
+        ctx._source.putAll(params.doc);
+        ctx._source.BinlogSeq = params.seq;
+    }
+"""
+
+# 按序号删除工单文档，清空内容只保留序号和墓碑标记，重放时较旧的写入不会把文档写回，params: seq序号
+DOC_DELETE_SOURCE = """
+    if (ctx._source.BinlogSeq != null && ctx._source.BinlogSeq >= params.seq) {
+        ctx.op = 'none';
+    } else {
+        ctx._source.clear();
+        ctx._source.BinlogSeq = params.seq;
+        ctx._source.BinlogDeleted = true;
+    }
+"""
+
+# 按顺序对同一文档执行多个操作，params.ops中每项为:
+# {type: doc, doc, seq}合并顶层字段，{type: upsert, field, key, item}或{type: remove, field, key, value, seq}
+# 维护嵌套数组；seq和元素的BinlogSeq可省略，带有时与上面的脚本一样跳过较旧的更新
+NESTED_APPLY_SOURCE = """
+    for (def op : params.ops) {
+        if (op.type == 'doc') {
+            if (op.seq != null) {
+                if (ctx._source.BinlogSeq != null && ctx._source.BinlogSeq >= op.seq) {
+                    continue;
+                }
+                ctx._source.BinlogSeq = op.seq;
+                ctx._source.remove('BinlogDeleted');
+            }
+            ctx._source.putAll(op.doc);
+            continue;
+        }
+        def items = ctx._source[op.field];
+        def removed = ctx._source.BinlogRemoved == null ? null : ctx._source.BinlogRemoved[op.field];
+        if (op.type == 'upsert') {
+            def seq = op.item.BinlogSeq;
+            def removedKey = String.valueOf(op.item[op.key]);
+            def removedSeq = removed == null ? null : removed[removedKey];
+            if (seq != null && ((ctx._source.BinlogDeleted == true && ctx._source.BinlogSeq >= seq)
+                    || (removedSeq != null && removedSeq >= seq))) {
+                continue;
+            }
+            if (removedSeq != null) {
+                removed.remove(removedKey);
+            }
+            if (items == null) {
+                items = new ArrayList();
+                ctx._source[op.field] = items;
+            }
+            def found = false;
+            for (int i=0; i<items.size(); i++) {
+                if (items[i][op.key] == op.item[op.key]) {
+                    if (seq == null || items[i].BinlogSeq == null || items[i].BinlogSeq < seq) {
+                        items.set(i, op.item);
+                    }
+                    found = true;
+                    break;
+                }
+            }
+            if (!found) {
+                items.add(op.item);
+            }
+        } else {
+            if (op.seq != null) {
+                if (removed == null) {
+                    if (ctx._source.BinlogRemoved == null) {
+                        ctx._source.BinlogRemoved = new HashMap();
+                    }
+                    removed = new HashMap();
+                    ctx._source.BinlogRemoved[op.field] = removed;
+                }
+                def removedKey = String.valueOf(op.value);
+                if (removed[removedKey] == null || removed[removedKey] < op.seq) {
+                    removed[removedKey] = op.seq;
+                }
+                long horizon = op.seq - REMOVED_RETENTIONL;
+                removed.values().removeIf(s -> s < horizon);
+            }
+            if (items == null) {
+                continue;
+            }
+            def iterator = items.iterator();
+            while (iterator.hasNext()) {
+                def item = iterator.next();
+                if (item[op.key] == op.value
+                        && (op.seq == null || item.BinlogSeq == null || item.BinlogSeq < op.seq)) {
+                    iterator.remove();
+                }
+            }
+        }
+    }
+""".replace("REMOVED_RETENTION", str(REMOVED_RETENTION))
+
+# 在线初始化写入快照数据，只补充binlog流尚未写入的部分，params: doc顶层字段(可为null),
+# doc_key判断顶层字段是否已写入的字段名, nested: {数组字段名: [元素]}, keys: {数组字段名: 主键字段名}
+# binlog流已删除的工单留有墓碑，不补写；有删除记录的嵌套元素也不补写
+SNAPSHOT_FILL_SOURCE = """
+    if (ctx._source.BinlogDeleted == true) {
+        ctx.op = 'none';
+    } else {
+        if (params.doc != null && !ctx._source.containsKey(params.doc_key)) {
+            ctx._source.putAll(params.doc);
+        }
+        for (def entry : params.nested.entrySet()) {
+            def field = entry.getKey();
+            def key = params.keys[field];
+            def removed = ctx._source.BinlogRemoved == null ? null : ctx._source.BinlogRemoved[field];
+            def items = ctx._source[field];
+            if (items == null) {
+                items = new ArrayList();
+                ctx._source[field] = items;
+            }
+            def existing = new HashSet();
+            for (def item : items) {
+                existing.add(item[key]);
+            }
+            for (def item : entry.getValue()) {
+                if (!existing.contains(item[key])
+                        && (removed == null || !removed.containsKey(String.valueOf(item[key])))) {
+                    items.add(item);
+                }
+            }
+        }
+    }
+"""
+
+
+def _script_id(name: str, source: str) -> str:
+    """脚本ID带上内容摘要，脚本内容变更后以新ID注册，新旧版本可同时运行"""
+    digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:8]
+    return f"orderes_{name}_{digest}"
+
+
+NESTED_UPSERT_ID = _script_id("nested_upsert", NESTED_UPSERT_SOURCE)
+NESTED_REMOVE_ID = _script_id("nested_remove", NESTED_REMOVE_SOURCE)
+NESTED_APPLY_ID = _script_id("nested_apply", NESTED_APPLY_SOURCE)
+DOC_UPSERT_ID = _script_id("doc_upsert", DOC_UPSERT_SOURCE)
+DOC_DELETE_ID = _script_id("doc_delete", DOC_DELETE_SOURCE)
+SNAPSHOT_FILL_ID = _script_id("snapshot_fill", SNAPSHOT_FILL_SOURCE)
+
+STORED_SCRIPTS = {
+    NESTED_UPSERT_ID: NESTED_UPSERT_SOURCE,
+    NESTED_REMOVE_ID: NESTED_REMOVE_SOURCE,
+    NESTED_APPLY_ID: NESTED_APPLY_SOURCE,
+    DOC_UPSERT_ID: DOC_UPSERT_SOURCE,
+    DOC_DELETE_ID: DOC_DELETE_SOURCE,
+    SNAPSHOT_FILL_ID: SNAPSHOT_FILL_SOURCE,
+}
+
+
+def stored_script(script_id: str, params: dict) -> dict:
+    """引用存储脚本，请求中只携带脚本ID和参数"""
+    return {"id": script_id, "params": params}
+
+
+def register_scripts(es_client: Elasticsearch) -> bool:
+    """注册存储脚本，已存在且内容一致时跳过
+
+    Returns:
+        bool: 全部脚本是否可用
+    """
+    result = True
+    for script_id, source in STORED_SCRIPTS.items():
+        try:
+            try:
+                current = es_client.get_script(id=script_id)
+                if current.get("script", {}).get("source") == source:
+                    continue
+            except NotFoundError:
+                pass
+            es_client.put_script(id=script_id, body={"script": {"lang": "painless", "source": source}})
+            logger.info(f"已注册ES存储脚本: {script_id}")
+        except Exception as e:
+            logger.error(f"注册ES存储脚本失败: {script_id}, {str(e)}")
+            result = False
+    return result
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 在线初始化期间记录binlog流删除的行
+
+from typing import Dict, List, Tuple
+import threading
+
+from handlers import TABLE_SPECS, TableSpec
+from scripts import SEQ_FIELD
+
+# 宽表顶层字段所在的表，删除后整个文档删除
+DOC_TABLES = {spec.table for spec in TABLE_SPECS.values() if spec.kind == "doc"}
+
+
+class DeletedRows:
+    """在线初始化期间binlog流删除的行
+
+    快照补写与binlog流并发进行，流已删除的行可能又被快照补写回来。补写时跳过已记录删除的行，
+    初始化结束后再对记录的行重新执行一次删除，覆盖记录之前已补写的部分。
+    删除后又被插入或更新的行以流为准，从记录中移除。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[Tuple[str, str], Dict] = {}
+        self._active = False
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    def start(self):
+        """开始记录"""
+        with self._lock:
+            self._rows.clear()
+            self._active = True
+
+    def stop(self) -> List[Tuple[str, Dict]]:
+        """停止记录，返回记录的(表名, 行)"""
+        with self._lock:
+            self._active = False
+            rows, self._rows = self._rows, {}
+        return [(table, row) for (table, _), row in rows.items()]
+
+    def record(self, table: str, row: Dict):
+        """记录一行删除，只保留定位目标文档和嵌套元素需要的列，开启版本号时保留binlog序号"""
+        if not self._active:
+            return
+        spec = TABLE_SPECS.get(table)
+        if spec is None:
+            return
+        with self._lock:
+            deleted = {
+                'Id': row.get('Id'),
+                spec.doc_id_column: row.get(spec.doc_id_column),
+            }
+            if SEQ_FIELD in row:
+                deleted[SEQ_FIELD] = row[SEQ_FIELD]
+            self._rows[(table, str(row.get('Id')))] = deleted
+
+    def forget(self, table: str, row: Dict):
+        """该行在删除之后又被插入或更新，不再跳过补写，也不在结束时重新删除"""
+        if not self._active:
+            return
+        with self._lock:
+            self._rows.pop((table, str(row.get('Id'))), None)
+
+    def observe(self, table: str, action: str, row: Dict):
+        """按binlog流的操作类型记录删除或撤销之前记录的删除"""
+        if action == "delete":
+            self.record(table, row)
+        else:
+            self.forget(table, row)
+
+    def is_deleted(self, spec: TableSpec, data: Dict) -> bool:
+        """该行或其所属的工单文档已被binlog流删除"""
+        if not self._active:
+            return False
+        if (spec.table, str(data.get('Id'))) in self._rows:
+            return True
+        return spec.kind != "index" and any((table, spec.doc_id(data)) in self._rows for table in DOC_TABLES)
+
+
+# binlog监听和在线初始化在同一进程中共用
+DELETED_ROWS = DeletedRows()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 批量写入的失败计数：可重试错误计入失败，永久错误记入死信日志
+
+import json
+
+import pytest
+
+pytest.importorskip("elasticsearch")
+pytest.importorskip("loguru")
+
+import dead_letter
+from bulk_writer import BulkWriter
+
+
+class BulkES:
+    """按items依次返回每个_bulk请求的单条结果状态码"""
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    def bulk(self, body):
+        statuses = self.responses.pop(0)
+        items = [{"index": {"status": status, "error": f"status {status}"}} for status in statuses]
+        return {"errors": any(status >= 300 for status in statuses), "items": items}
+
+
+@pytest.fixture
+def dead_letters(monkeypatch, tmp_path):
+    path = tmp_path / "dead_letter.log"
+    monkeypatch.setattr(dead_letter, "dead_letter_file", str(path))
+    return lambda: [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()] if path.exists() else []
+
+
+def add(writer, row_id):
+    writer.add({"_op_type": "index", "_index": "test", "_id": str(row_id), "_source": {"Id": row_id}},
+               {"table": "tb_test", "Id": row_id})
+
+
+def test_permanent_errors_go_to_dead_letter(dead_letters):
+    writer = BulkWriter(BulkES([400, 429, 503, 201]), max_actions=10)
+    for row_id in range(4):
+        add(writer, row_id)
+    assert writer.flush() == 2
+    records = dead_letters()
+    assert [record["rows"][0]["Id"] for record in records] == [0]
+    assert records[0]["action"]["_id"] == "0"
+
+
+def test_automatic_flush_failures_returned_by_next_flush(dead_letters):
+    writer = BulkWriter(BulkES([503, 201], [201]), max_actions=2)
+    for row_id in range(3):
+        add(writer, row_id)
+    assert writer.flush() == 1
+    assert writer.flush() == 0
+    assert dead_letters() == []
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 合并后的新建文档与脚本的序号规则一致
+
+import pytest
+
+pytest.importorskip("elasticsearch")
+pytest.importorskip("loguru")
+
+from doc_aggregator import DocumentAggregator
+from handlers import TABLE_SPECS, TableHandler
+from scripts import REMOVED_FIELD
+
+
+def service_action(action, row_id, seq):
+    handler = TableHandler(None, TABLE_SPECS["tb_workserviceinfo"])
+    return handler.build_actions(action, {"Id": row_id, "WorkOrderId": "9", "BinlogSeq": seq})[0]
+
+
+def merged_upsert(*actions):
+    merged = DocumentAggregator().merge([(es_action, []) for es_action in actions])
+    assert len(merged) == 1
+    return merged[0][0]["upsert"]
+
+
+def test_older_upsert_after_remove_is_skipped():
+    doc = merged_upsert(service_action("delete", "7", 200), service_action("insert", "7", 100),
+                        service_action("insert", "8", 150))
+    assert [item["Id"] for item in doc["ServiceInfo"]] == ["8"]
+    assert doc[REMOVED_FIELD] == {"ServiceInfo": {"7": 200}}
+
+
+def test_newer_upsert_after_remove_clears_record():
+    doc = merged_upsert(service_action("delete", "7", 200), service_action("insert", "7", 300))
+    assert [item["BinlogSeq"] for item in doc["ServiceInfo"]] == [300]
+    assert doc[REMOVED_FIELD] == {"ServiceInfo": {}}
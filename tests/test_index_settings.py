@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 批量导入设置的切换与恢复
+
+import pytest
+
+pytest.importorskip("elasticsearch")
+pytest.importorskip("loguru")
+
+from index_settings import BULK_LOAD_SETTINGS, BulkLoadSettings
+
+ORIGINAL = {"refresh_interval": "30s", "number_of_replicas": "1"}
+
+
+class FakeIndices:
+    """记录每个索引当前的设置，切换到fail_on索引时抛出异常"""
+    def __init__(self, names, fail_on=None):
+        self.settings = {name: dict(ORIGINAL) for name in names}
+        self.fail_on = fail_on
+
+    def exists(self, index):
+        return index in self.settings
+
+    def get_settings(self, index, name):
+        return {index: {"settings": {"index": dict(self.settings[index])}}}
+
+    def put_settings(self, index, body):
+        if index == self.fail_on and body["index"] == BULK_LOAD_SETTINGS:
+            raise RuntimeError("put_settings failed")
+        self.settings[index].update(body["index"])
+
+
+class FakeES:
+    def __init__(self, names, fail_on=None):
+        self.indices = FakeIndices(names, fail_on)
+
+
+def test_settings_restored_after_load(tmp_path):
+    es = FakeES(["a", "b"])
+    backup = tmp_path / "bulk_settings.json"
+    with BulkLoadSettings(es, ["a", "b"], str(backup)):
+        assert es.indices.settings["a"] == BULK_LOAD_SETTINGS
+    assert es.indices.settings == {"a": ORIGINAL, "b": ORIGINAL}
+    assert not backup.exists()
+
+
+def test_switched_indices_restored_when_enter_fails(tmp_path):
+    es = FakeES(["a", "b"], fail_on="b")
+    backup = tmp_path / "bulk_settings.json"
+    with pytest.raises(RuntimeError):
+        with BulkLoadSettings(es, ["a", "b"], str(backup)):
+            pytest.fail("切换失败时不应进入with块")
+    assert es.indices.settings == {"a": ORIGINAL, "b": ORIGINAL}
+    assert not backup.exists()
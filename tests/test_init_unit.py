@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: 初始化工作单元在任一批次写入失败时不记为完成
+
+import os
+
+import pytest
+
+pytest.importorskip("pymysql")
+pytest.importorskip("elasticsearch")
+pytest.importorskip("loguru")
+if not os.path.exists(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "conf", "db.cnf")):
+    pytest.skip("缺少conf/db.cnf", allow_module_level=True)
+
+from bulk_writer import BulkWriter
+from etl import init_data
+
+
+class FlakyES:
+    """前failures次_bulk请求失败"""
+    def __init__(self, failures):
+        self.failures = failures
+        self.requests = 0
+
+    def bulk(self, body):
+        self.requests += 1
+        if self.requests <= self.failures:
+            raise ConnectionError("bulk rejected")
+        return {"errors": False, "items": []}
+
+
+class BulkProcessor:
+    """每个事件写入一个index动作，失败数由BulkWriter.flush返回"""
+    def __init__(self, bulk_writer, fail_at=None):
+        self.bulk_writer = bulk_writer
+        self.fail_at = fail_at
+
+    def handle_event(self, action, data):
+        if data["Id"] == self.fail_at:
+            raise ValueError("bad row")
+        self.bulk_writer.add({"_op_type": "index", "_index": "test", "_id": data["Id"], "_source": data}, data)
+        return True
+
+    def flush(self):
+        return self.bulk_writer.flush()
+
+
+def run_unit(monkeypatch, processor, rows):
+    def id_batches(*args, **kwargs):
+        yield from ()
+
+    def events(*args, **kwargs):
+        yield from ({"table": "tb_workorderinfo", "Id": row_id} for row_id in rows)
+
+    monkeypatch.setattr(init_data, "init_mode", "event")
+    monkeypatch.setattr(init_data, "_get_worker_resources", lambda: (None, None, None, processor))
+    monkeypatch.setattr(init_data, "iter_order_id_batches", id_batches)
+    monkeypatch.setattr(init_data, "table_events", events)
+    return init_data.process_unit("tb_workorderinfo", (1, 100), None, None)
+
+
+def test_intermediate_flush_failure_fails_unit(monkeypatch):
+    # 前两行按数量阈值自动提交时失败，最后一行在单元结束时提交成功
+    es = FlakyES(failures=1)
+    processor = BulkProcessor(BulkWriter(es, max_actions=2))
+    with pytest.raises(RuntimeError, match="2 个ES动作写入失败"):
+        run_unit(monkeypatch, processor, [1, 2, 3])
+    assert es.requests == 2
+
+
+def test_failed_unit_does_not_leak_into_next(monkeypatch):
+    es = FlakyES(failures=0)
+    processor = BulkProcessor(BulkWriter(es, max_actions=10), fail_at=2)
+    with pytest.raises(ValueError):
+        run_unit(monkeypatch, processor, [1, 2])
+    # 出错单元缓冲的动作已提交，下一个单元只看到自己的动作
+    assert es.requests == 1
+    processor.fail_at = None
+    processed, _ = run_unit(monkeypatch, processor, [3])
+    assert processed == 1
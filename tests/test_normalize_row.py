@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# @author by wangcw @ 2025
+# comment: normalize_row和RowConverter与原有dict_to_json转换路径的一致性
+
+import collections
+import datetime
+import decimal
+import json
+
+import pytest
+
+from utils import dict_to_json, normalize_row
+
+# binlog表结构中的列定义
+Column = collections.namedtuple("Column", ["name", "type"])
+
+ROWS = [
+    pytest.param({"Id": 1, "CarPrice": decimal.Decimal("123.45"), "Zero": decimal.Decimal("0.00")}, id="decimal"),
+    pytest.param({
+        "CreatedAt": datetime.datetime(2025, 4, 10, 15, 58, 28),
+        "InstallDate": datetime.date(2025, 4, 10),
+        "InstallClock": datetime.time(8, 30, 0),
+    }, id="datetime-date-time"),
+    pytest.param({"Remark": "备注".encode("utf-8"), "Raw": b"\xff\xfe", b"ByteKey": "value"}, id="bytes"),
+    pytest.param({"Id": 1, "DeletedAt": None, "Remark": None}, id="none"),
+    pytest.param({
+        "ExtraJson": "{'a': 1, 'b': [1, 2]}",
+        "BussinessJson": '{"keep": "string"}',
+        "Config": '{"nested": {"x": "1"}}',
+        "Tags": "['a', 'b']",
+        "Broken": "{not json}",
+        "BadJson": "{'a': }",
+    }, id="nested-json"),
+    pytest.param({
+        "Extra": {b"key": decimal.Decimal("1.5"), "list": [datetime.datetime(2025, 1, 1), b"x"]},
+        "Items": [1, "'quoted'", None],
+    }, id="nested-containers"),
+    pytest.param({"schema": "db", "action": "update", "table": "tb_workorderinfo", "Name": "'quoted'"},
+                 id="reserved-keys"),
+    pytest.param({"Price": 1.5, "Flag": True, "Count": 0}, id="scalars"),
+]
+
+
+@pytest.mark.parametrize("row", ROWS)
+def test_normalize_row_matches_dict_to_json(row):
+    assert normalize_row(row) == json.loads(dict_to_json(row))
+
+
+def test_rows_from_binlog_events():
+    """binlog事件的行镜像带有schema/action，转换时丢弃"""
+    row = {"schema": "db", "table": "tb_workcarinfo", "action": "insert", "Id": 7,
+           "CreatedAt": datetime.datetime(2025, 4, 10), "CarPrice": decimal.Decimal("9.90")}
+    assert normalize_row(row) == {"table": "tb_workcarinfo", "Id": 7, "CreatedAt": "2025-04-10 00:00:00",
+                                  "CarPrice": "9.90"}
+
+
+class TestRowConverter:
+    """按列类型预编译的转换器与normalize_row({"table": 表名, **values})结果一致"""
+
+    @pytest.fixture(autouse=True)
+    def _field_type(self):
+        constants = pytest.importorskip("pymysqlreplication.constants")
+        self.FIELD_TYPE = constants.FIELD_TYPE
+
+    def converter(self, table, columns):
+        from row_converter import RowConverter
+        return RowConverter(table, [Column(name, column_type) for name, column_type in columns])
+
+    def test_typed_columns(self):
+        t = self.FIELD_TYPE
+        converter = self.converter("tb_workcarinfo", [
+            ("Id", t.LONGLONG), ("CarPrice", t.NEWDECIMAL), ("CreatedAt", t.DATETIME2),
+            ("UpdatedAt", t.TIMESTAMP2), ("Remark", t.VARCHAR), ("Payload", t.BLOB),
+            ("ExtraJson", t.VARCHAR), ("BussinessJson", t.VARCHAR), ("Deleted", t.TINY),
+        ])
+        rows = [
+            {"Id": 7, "CarPrice": decimal.Decimal("12.30"), "CreatedAt": datetime.datetime(2025, 4, 10, 1, 2, 3),
+             "UpdatedAt": datetime.datetime(2025, 4, 11), "Remark": "'quoted'", "Payload": "备注".encode("utf-8"),
+             "ExtraJson": "{'a': 1}", "BussinessJson": '{"b": 2}', "Deleted": 0},
+            {"Id": None, "CarPrice": None, "CreatedAt": None, "UpdatedAt": None, "Remark": "{'x': [1]}",
+             "Payload": b"\xff", "ExtraJson": "not json", "BussinessJson": "[1, 2]", "Deleted": None},
+            # 值的类型与列类型不符时回退到通用转换
+            {"Id": "7", "CarPrice": 1.5, "CreatedAt": "2025-04-10", "UpdatedAt": datetime.date(2025, 4, 10),
+             "Remark": b"bytes", "Payload": "text", "ExtraJson": {"k": "v"}, "BussinessJson": None, "Deleted": True},
+        ]
+        for values in rows:
+            assert converter.convert(values) == normalize_row({"table": "tb_workcarinfo", **values})
+
+    def test_unknown_and_reserved_columns(self):
+        t = self.FIELD_TYPE
+        converter = self.converter("tb_custcolumn", [("Id", t.LONG), ("action", t.VARCHAR), ("schema", t.VARCHAR)])
+        values = {"Id": 1, "action": "x", "schema": "y", "Extra": decimal.Decimal("1.0")}
+        assert converter.convert(values) == normalize_row({"table": "tb_custcolumn", **values})